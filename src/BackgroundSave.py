@@ -0,0 +1,25 @@
+from PyQt5.QtCore import QThread, pyqtSignal
+
+
+class BackgroundSave(QThread):
+    """Writes a Document.snapshot() on a worker thread so the window stays responsive.
+
+    Signals arrive on the GUI thread: progress(done, total) after every file and
+    completed(written, failures) with the result of Document.write_snapshot().
+    """
+
+    progress = pyqtSignal(int, int)
+    completed = pyqtSignal(list, list)
+
+    def __init__(self, document, snapshot, parent=None):
+        super().__init__(parent)
+        self.document = document
+        self.snapshot = snapshot
+
+    def run(self):
+        try:
+            written, failures = self.document.write_snapshot(self.snapshot, self.progress.emit)
+        except Exception as e:
+            # completed has to fire whatever happens, or the chapters are never marked dirty again
+            written, failures = [], [(chapter, e) for chapter, _ in self.snapshot]
+        self.completed.emit(written, failures)
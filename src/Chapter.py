@@ -1,82 +1,216 @@
-from datetime import datetime, timedelta
+import functools
+import hashlib
+import os
+import shutil
+import tempfile
+from datetime import date, datetime, timedelta
+
+# Fields that end up in the .nwd file; changing one of them marks the chapter dirty
+METADATA_FIELDS = ("chapter", "plot", "pov", "char", "synopsis", "startdate", "enddate")
+
+# Line prefix -> what it holds; a single dict lookup per line replaces a chain of startswith checks
+PREFIXES = {
+    "%%~name:": "chapter",
+    "%%~date:": "date",
+    "@plot:": "plot",
+    "@pov:": "pov",
+    "@char:": "char",
+    "@time:": "time",
+    "% Synopsis:": "synopsis",
+}
+PREFIX_LENGTH = max(len(prefix) for prefix in PREFIXES)
+# Lines Chapter.write replaces by its own metadata block
+WRITTEN_PREFIXES = ("@plot:", "@pov:", "@char:", "@time:", "% Synopsis:")
+# Synopses of lazy chapters kept in memory, e.g. the last selected ones
+SYNOPSIS_CACHE_SIZE = 256
+# Date field -> attribute with the same date as day ordinal, kept up to date on every assignment
+DAY_FIELDS = {"startdate": "start_day", "enddate": "end_day"}
+DEFAULT_STARTDATE = date(2022, 1, 1)
+DEFAULT_ENDDATE = date(2022, 1, 2)
+
+
+@functools.lru_cache(maxsize=4096)
+def parse_date(text):
+    # Chapters share most of their dates, so each distinct string is parsed once.
+    # Plain YYYY-MM-DD takes the fast ISO path; anything else gets strptime's more lenient rules
+    if len(text) == 10 and text[4] == "-" and text[7] == "-":
+        try:
+            return date.fromisoformat(text)
+        except ValueError:
+            pass
+    return datetime.strptime(text, "%Y-%m-%d").date()
+
 
 class Chapter:
-    def __init__(self, path):
+    def __init__(self, path, header_only=True, lazy_synopsis=False):
+        # lazy_synopsis: only remember where the synopsis is in the file, read_synopsis() fetches it when needed
         self.path = path
+        self.project = ""  # set by the Document, after the root the file was found in
+        self.synopsis_offset = None
         self.chapter = ""
         self.plot = ""
         self.pov = ""
         self.char = ""
         self.synopsis = ""
-        self.startdate = datetime.strptime("2022-01-01", "%Y-%m-%d").date()
-        self.enddate = datetime.strptime("2022-01-02", "%Y-%m-%d").date()
+        self.startdate = DEFAULT_STARTDATE
+        self.enddate = DEFAULT_ENDDATE
 
+        values = {}
         time_values = []
-        synopsis_value = None
-        plot_value = None
-        with open(self.path, "r", encoding="utf-8") as file:
-            for line in file:
-                if line.startswith("%%~name:"):
-                    self.chapter = line.split("%%~name:")[1].strip()
-                elif line.startswith("@plot:"):
-                    plot_value = line.split("@plot:")[1].strip()
-                elif line.startswith("@pov:"):
-                    self.pov = line.split("@pov:")[1].strip()
-                elif line.startswith("@char:"):
-                    self.char = line.split("@char:")[1].strip()
-                elif line.startswith("% Synopsis:"):
-                    synopsis_value = line.split("% Synopsis:")[1].strip()
-                elif line.startswith("@time:"):
-                    time_value = line.split("@time:")[1].strip()
+        header_done = False
+        synopsis_offset = None
+        position = 0
+        with open(self.path, "rb") as file:
+            for raw in file:
+                # Binary lines so the byte offset of the synopsis line is known
+                line = raw.decode("utf-8")
+                offset = position
+                position += len(raw)
+                colon = line.find(":", 0, PREFIX_LENGTH)
+                key = PREFIXES.get(line[:colon + 1]) if colon > 0 else None
+                if key == "time":
                     try:
-                        time_values.append(datetime.strptime(time_value, "%Y-%m-%d").date())
+                        time_values.append(parse_date(line[colon + 1:].strip()))
                     except ValueError:
                         continue
+                elif key == "date":
+                    header_done = True
+                elif key is not None:
+                    values[key] = line[colon + 1:].strip()
+                    if key == "synopsis":
+                        synopsis_offset = offset
+                elif header_only and header_done and time_values and line[0] not in "#@%" and line.strip():
+                    # First prose after the %%~ header and the @time: tags: the metadata block is over. Headings
+                    # do not stop the scan, novelWriter puts tags below them. Files without %%~date:, or whose
+                    # @time: tags come after the prose, are scanned fully.
+                    break
 
+        self.chapter = values.get("chapter", self.chapter)
+        self.pov = values.get("pov", self.pov)
+        self.char = values.get("char", self.char)
         if time_values:
             self.startdate = min(time_values)
             self.enddate = max(time_values) if len(time_values) > 1 else (time_values[0] + timedelta(days=1))
-        else:
-            return None
-        if plot_value:
-            self.plot = plot_value
-        if synopsis_value:
-            self.synopsis = synopsis_value   
+            if values.get("plot"):
+                self.plot = values["plot"]
+            if values.get("synopsis"):
+                if lazy_synopsis:
+                    self._synopsis = None
+                    self.synopsis_offset = synopsis_offset
+                else:
+                    self.synopsis = values["synopsis"]
+        self.dirty = False
+
+    @property
+    def synopsis(self):
+        if self._synopsis is None:
+            try:
+                return read_synopsis(self)
+            except OSError as e:
+                print(f"Error: {e}")
+                return ""  # only shown, snapshot() reads the file again
+        return self._synopsis
+
+    @synopsis.setter
+    def synopsis(self, value):
+        self._synopsis = value
+
+    def stored_synopsis(self):
+        # (text, None) when the synopsis is in memory, (None, byte offset) when it still is only in the file
+        return self._synopsis, self.synopsis_offset
 
+    def __setattr__(self, name, value):
+        # Once loaded, every change of a metadata field has to be saved
+        if name in METADATA_FIELDS and "dirty" in self.__dict__ and getattr(self, name) != value:
+            self.__dict__["dirty"] = True
+        super().__setattr__(name, value)
+        if name in DAY_FIELDS:
+            self.__dict__[DAY_FIELDS[name]] = value.toordinal()
+
+    def metadata(self):
+        return tuple(getattr(self, field) for field in METADATA_FIELDS)
+
+    def snapshot(self):
+        # metadata() to write from another thread. A lazy synopsis is kept in memory from now on:
+        # its offset is no good once the file is rewritten
+        # An OSError goes to the caller: a failed read must never end up in the file as an empty synopsis
+        if self._synopsis is None:
+            self._synopsis = read_synopsis(self)
+        self.synopsis_offset = None
+        return self.metadata()
+
+    @classmethod
+    def from_fields(cls, path, chapter, plot, pov, char, synopsis, startdate, enddate, synopsis_offset=None):
+        # Build a chapter from already parsed metadata (e.g. the on-disk index) without opening the file.
+        # A synopsis of None with an offset makes a lazy chapter
+        # A fresh chapter has nothing to mark dirty, so the fields go straight into __dict__ past __setattr__
+        self = cls.__new__(cls)
+        self.__dict__.update(path=path, project="", synopsis_offset=synopsis_offset, chapter=chapter, plot=plot,
+                             pov=pov, char=char, _synopsis=synopsis, startdate=startdate, enddate=enddate,
+                             start_day=startdate.toordinal(), end_day=enddate.toordinal(), dirty=False)
+        return self
     
     
-    def write(self):
-        with open(self.path, "r", encoding="utf-8") as file:
-            lines = file.readlines()                
-            # Remove existing @plot: and @time:
-        lines = [line for line in lines if not line.startswith("@plot:") and not line.startswith("@pov:") and not line.startswith("@char:") and not line.startswith("@time:") and not line.startswith("% Synopsis:")]
-        
-        # Add new metadata 
-        updated_lines = [line for line in lines if False]
+    def write(self, metadata=None):
+        # Streams the file into a temp file in the same directory and swaps it in with os.replace,
+        # so a crash never leaves a half-written chapter. Returns True when the file was rewritten,
+        # False when its content would stay the same.
+        # With a snapshot() as metadata the chapter itself is not touched, so edits can go on meanwhile
+        fields = dict(zip(METADATA_FIELDS, metadata if metadata is not None else self.snapshot()))
+        original_hash = hashlib.sha1()
+        updated_hash = hashlib.sha1()
+
+        def hashed(lines):
+            for line in lines:
+                original_hash.update(line.encode("utf-8"))
+                yield line
+
+        with open(self.path, "r", encoding="utf-8") as source, tempfile.NamedTemporaryFile(
+                "w", encoding="utf-8", dir=os.path.dirname(os.path.abspath(self.path)),
+                prefix=".", suffix=".tmp", delete=False) as target:
+            try:
+                for line in self.rewrite_lines(hashed(source), fields):
+                    updated_hash.update(line.encode("utf-8"))
+                    target.write(line)
+                unchanged = updated_hash.digest() == original_hash.digest()
+                if not unchanged:
+                    target.flush()
+                    os.fsync(target.fileno())
+            except BaseException:
+                target.close()
+                os.remove(target.name)
+                raise
+        if unchanged:
+            os.remove(target.name)
+        else:
+            shutil.copymode(self.path, target.name)
+            os.replace(target.name, self.path)
+        if metadata is None:
+            self.dirty = False
+        return not unchanged
+
+    def rewrite_lines(self, lines, fields):
+        # Existing @plot:, @time:, ... lines are dropped and a fresh block is put after %%~date:
         name_not_in_headline_yet = True
         for line in lines:
+            if line.startswith(WRITTEN_PREFIXES):
+                continue
             # Kop gelijk trekken met naam
-            if  line.startswith("#") and name_not_in_headline_yet:                 
-                if line.startswith("# "): 
-                    updated_lines.append(f"# {self.chapter}\n")
-                    name_not_in_headline_yet = False
-                elif line.startswith("## "): 
-                    updated_lines.append(f"## {self.chapter}\n")
-                    name_not_in_headline_yet = False
-                elif line.startswith("### "): 
-                    updated_lines.append(f"### {self.chapter}\n")
-                    name_not_in_headline_yet = False
-            else:               
-                updated_lines.append(line)
+            if line.startswith("#") and name_not_in_headline_yet:
+                for heading in ("# ", "## ", "### "):
+                    if line.startswith(heading):
+                        yield f"{heading}{fields['chapter']}\n"
+                        name_not_in_headline_yet = False
+                        break
+            else:
+                yield line
                 if line.startswith("%%~date:"):
-                    updated_lines.append(f"@plot: {self.plot}\n")
-                    updated_lines.append(f"@time: {self.startdate.strftime('%Y-%m-%d')}\n")
-                    updated_lines.append(f"@time: {self.enddate.strftime('%Y-%m-%d')}\n")
-                    updated_lines.append(f"@pov: {self.pov}\n")
-                    updated_lines.append(f"@char: {self.char}\n")
-                    updated_lines.append(f"% Synopsis: {self.synopsis}\n")
-        with open(self.path, "w", encoding="utf-8") as file:
-            file.writelines(updated_lines)
+                    yield f"@plot: {fields['plot']}\n"
+                    yield f"@time: {fields['startdate'].strftime('%Y-%m-%d')}\n"
+                    yield f"@time: {fields['enddate'].strftime('%Y-%m-%d')}\n"
+                    yield f"@pov: {fields['pov']}\n"
+                    yield f"@char: {fields['char']}\n"
+                    yield f"% Synopsis: {fields['synopsis']}\n"
 
     # def __repr__(self):
     #     return "Test()"
@@ -84,6 +218,18 @@ class Chapter:
         return f"name: {self.chapter}\n plot: {self.plot}\ntime: {self.startdate.strftime('%Y-%m-%d')}\ntime: {self.enddate.strftime('%Y-%m-%d')}\npov: {self.pov}\nchar: {self.char}\n"
 
 
+@functools.lru_cache(maxsize=SYNOPSIS_CACHE_SIZE)
+def read_synopsis(chapter):
+    # Keyed on the chapter object: a re-parsed file is a new Chapter, so nothing stale is returned.
+    # An OSError is raised, not cached, so the next call tries the file again
+    with open(chapter.path, "rb") as file:
+        file.seek(chapter.synopsis_offset)
+        line = file.readline().decode("utf-8")
+    if line.startswith("% Synopsis:"):
+        return line[len("% Synopsis:"):].strip()
+    return Chapter(chapter.path).synopsis  # changed on disk since it was parsed
+
+
 def main():
     print("x")
 
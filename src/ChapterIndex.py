@@ -0,0 +1,62 @@
+import os
+import sqlite3
+from contextlib import closing
+from datetime import date
+from Chapter import Chapter
+
+# Bump when the stored columns change; an index with another version is rebuilt from the files
+SCHEMA_VERSION = 2
+
+
+class ChapterIndex:
+    """Persistent SQLite cache of parsed chapter metadata, keyed by file path.
+
+    Every row carries the (mtime, size, inode) fingerprint the file had when it was parsed,
+    so a caller can trust a row as long as os.stat still returns the same fingerprint.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with closing(self.connect()) as connection, connection:
+            if connection.execute("PRAGMA user_version").fetchone()[0] != SCHEMA_VERSION:
+                connection.execute("DROP TABLE IF EXISTS chapters")
+                connection.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS chapters ("
+                " path TEXT PRIMARY KEY, mtime INTEGER, size INTEGER, inode INTEGER,"
+                " name TEXT, plot TEXT, pov TEXT, char TEXT, synopsis TEXT, synopsis_offset INTEGER,"
+                " startdate TEXT, enddate TEXT)")
+
+    @staticmethod
+    def default_path(directory):
+        # Next to the content directory, so novelWriter does not see it as a project file
+        return os.path.join(os.path.dirname(os.path.normpath(directory)), "timeline_index.sqlite")
+
+    def connect(self):
+        return sqlite3.connect(self.path)
+
+    def load(self):
+        """Return {path: (file_stat, chapter)} for every indexed file."""
+        entries = {}
+        with closing(self.connect()) as connection:
+            for row in connection.execute(
+                    "SELECT path, mtime, size, inode, name, plot, pov, char, synopsis, synopsis_offset,"
+                    " startdate, enddate FROM chapters"):
+                path, mtime, size, inode, name, plot, pov, char, synopsis, synopsis_offset, startdate, enddate = row
+                chapter = Chapter.from_fields(path, name, plot, pov, char, synopsis,
+                                              date.fromisoformat(startdate), date.fromisoformat(enddate),
+                                              synopsis_offset)
+                entries[path] = ((mtime, size, inode), chapter)
+        return entries
+
+    def update(self, entries, removed_paths=()):
+        """Store (file_stat, chapter) pairs and forget removed files in one transaction.
+
+        Lazy chapters are stored with their synopsis offset instead of the text, so they stay lazy.
+        """
+        rows = [(chapter.path, *file_stat, chapter.chapter, chapter.plot, chapter.pov, chapter.char,
+                 *chapter.stored_synopsis(), chapter.startdate.isoformat(), chapter.enddate.isoformat())
+                for file_stat, chapter in entries]
+        with closing(self.connect()) as connection, connection:
+            connection.executemany("INSERT OR REPLACE INTO chapters VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+            connection.executemany("DELETE FROM chapters WHERE path = ?", [(path,) for path in removed_paths])
@@ -0,0 +1,92 @@
+import numpy as np
+
+
+def split_plots(plot):
+    # Same split create_plot_groups always did: "a, b" is in plot "a" and plot "b", "" is a plot of its own
+    return [p.strip() for p in plot.split(",")]
+
+
+class ChapterTable:
+    """Columnar copy of the chapter fields the timeline works with; row i describes chapters[i].
+
+    Dates are day ordinals, plot/pov/char/project are codes into the matching *_names list. A chapter can be in
+    several plots; groups maps every plot code to its rows sorted by (start, end, row) and is kept
+    sorted by update(), so grouping a redraw never has to split or sort anything.
+    """
+
+    def __init__(self, chapters):
+        self.chapters = list(chapters)
+        self.rows = {chapter: row for row, chapter in enumerate(self.chapters)}
+        self.plot_names, self.pov_names, self.char_names, self.project_names = [], [], [], []
+        self.codes = {"plot": {}, "pov": {}, "char": {}, "project": {}}
+        count = len(self.chapters)
+        self.starts = np.fromiter((chapter.start_day for chapter in self.chapters), dtype=np.int64, count=count)
+        self.ends = np.fromiter((chapter.end_day for chapter in self.chapters), dtype=np.int64, count=count)
+        self.povs = np.fromiter((self.code("pov", chapter.pov) for chapter in self.chapters), dtype=np.int64, count=count)
+        self.chars = np.fromiter((self.code("char", chapter.char) for chapter in self.chapters), dtype=np.int64, count=count)
+        self.projects = np.fromiter((self.code("project", chapter.project) for chapter in self.chapters), dtype=np.int64, count=count)
+        self.row_plots = [[self.code("plot", plot) for plot in split_plots(chapter.plot)] for chapter in self.chapters]
+        member_rows = np.array([row for row, plots in enumerate(self.row_plots) for _ in plots], dtype=np.int64)
+        member_plots = np.array([plot for plots in self.row_plots for plot in plots], dtype=np.int64)
+        order = np.lexsort((member_rows, self.ends[member_rows], self.starts[member_rows], member_plots))
+        plots, firsts = np.unique(member_plots[order], return_index=True)
+        self.groups = dict(zip(plots.tolist(), np.split(member_rows[order], firsts[1:])))
+
+    def __len__(self):
+        return len(self.chapters)
+
+    def code(self, kind, value):
+        codes = self.codes[kind]
+        if value not in codes:
+            codes[value] = len(codes)
+            getattr(self, f"{kind}_names").append(value)
+        return codes[value]
+
+    def update(self, chapter):
+        """Copy an edited chapter's fields back into its row."""
+        row = self.rows[chapter]
+        self.starts[row] = chapter.start_day
+        self.ends[row] = chapter.end_day
+        self.povs[row] = self.code("pov", chapter.pov)
+        self.chars[row] = self.code("char", chapter.char)
+        self.projects[row] = self.code("project", chapter.project)
+        # Take the row out of its old groups and put it back at its sorted place in its current ones
+        for plot in set(self.row_plots[row]):
+            group = self.groups[plot]
+            self.groups[plot] = group[group != row]
+        self.row_plots[row] = [self.code("plot", plot) for plot in split_plots(chapter.plot)]
+        for plot in self.row_plots[row]:
+            group = self.groups.get(plot, np.zeros(0, dtype=np.int64))
+            starts, ends = self.starts[group], self.ends[group]
+            start, end = self.starts[row], self.ends[row]
+            # Row number breaks ties, which keeps equal chapters in document order
+            before = (starts < start) | ((starts == start) & ((ends < end) | ((ends == end) & (group < row))))
+            self.groups[plot] = np.insert(group, np.count_nonzero(before), row)
+
+    def replace(self, previous, chapter):
+        """Put a re-parsed chapter in the row of the object it replaces."""
+        row = self.rows.pop(previous)
+        self.chapters[row] = chapter
+        self.rows[chapter] = row
+        self.update(chapter)
+
+    def plot_groups(self, rows, by_project=False):
+        """{plot name: rows sorted by start, end} for the given rows, like create_plot_groups did with chapters.
+
+        by_project keeps equally named plots of different projects apart as "project: plot".
+        """
+        selected = np.zeros(len(self.chapters), dtype=bool)
+        selected[rows] = True
+        plot_groups = {}
+        for plot, group in self.groups.items():
+            picked = group[selected[group]]
+            if not len(picked):
+                continue
+            if not by_project:
+                plot_groups[self.plot_names[plot]] = picked
+                continue
+            projects = self.projects[picked]
+            for project in np.unique(projects).tolist():
+                # boolean selection keeps the sorted order within the project
+                plot_groups[f"{self.project_names[project]}: {self.plot_names[plot]}"] = picked[projects == project]
+        return plot_groups
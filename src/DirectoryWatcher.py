@@ -0,0 +1,152 @@
+import ctypes
+import ctypes.util
+import os
+import struct
+import sys
+import time
+
+# inotify(7) constants
+IN_MODIFY = 0x2
+IN_CLOSE_WRITE = 0x8
+IN_MOVED_FROM = 0x40
+IN_MOVED_TO = 0x80
+IN_CREATE = 0x100
+IN_DELETE = 0x200
+IN_Q_OVERFLOW = 0x4000
+IN_IGNORED = 0x8000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+WATCH_MASK = IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+EVENT_HEADER = struct.Struct("iIII")  # wd, mask, cookie, len
+
+
+def subdirectories(root):
+    # root and every directory below it, hidden ones (and what is in them) left out
+    directories = [root]
+    for directory in directories:
+        try:
+            with os.scandir(directory) as entries:
+                directories.extend(entry.path for entry in entries
+                                   if entry.is_dir() and not entry.name.startswith("."))
+        except (FileNotFoundError, NotADirectoryError):
+            continue
+    return directories
+
+
+def scan_tree(root):
+    # {path: (mtime, size, inode)} of every .nwd file below root
+    found = {}
+    for directory in subdirectories(root):
+        try:
+            with os.scandir(directory) as entries:
+                for entry in entries:
+                    if entry.name.endswith(".nwd") and not entry.is_dir():
+                        try:
+                            stat = entry.stat()
+                        except FileNotFoundError:
+                            continue
+                        found[entry.path] = (stat.st_mtime_ns, stat.st_size, stat.st_ino)
+        except (FileNotFoundError, NotADirectoryError):
+            continue
+    return found
+
+
+class DirectoryWatcher:
+    """Reports changed .nwd files of one directory and its subdirectories in debounced batches.
+
+    Uses inotify on Linux and falls back to comparing os.stat results of the directory listing.
+    Nothing runs by itself: whoever owns the watcher calls poll() regularly (a QTimer in the editor,
+    a plain loop in a script or test), so it works without an event loop or threads.
+    """
+
+    def __init__(self, directory, debounce=0.3, use_inotify=True):
+        self.directory = directory
+        self.debounce = debounce  # seconds without new events before a batch is reported
+        self.pending = set()
+        self.last_event = 0.0
+        self.fd = None
+        self.watches = {}  # inotify watch descriptor -> directory
+        if use_inotify and sys.platform.startswith("linux"):
+            self.fd = self.open_inotify()
+        self.snapshot = None if self.fd is not None else self.scan()
+
+    def open_inotify(self):
+        try:
+            self.libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+            fd = self.libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+            if fd < 0:
+                return None
+            if not self.add_watches(fd, self.directory):
+                os.close(fd)
+                return None
+            return fd
+        except (OSError, AttributeError):
+            return None
+
+    def add_watches(self, fd, root):
+        # inotify is not recursive: every directory gets a watch of its own
+        for directory in subdirectories(root):
+            wd = self.libc.inotify_add_watch(fd, os.fsencode(directory), WATCH_MASK)
+            if wd < 0:
+                if directory == root:
+                    return False
+                continue
+            self.watches[wd] = directory
+        return True
+
+    def close(self):
+        if self.fd is not None:
+            os.close(self.fd)
+            self.fd = None
+
+    def scan(self):
+        return scan_tree(self.directory)
+
+    def collect(self):
+        # Paths that changed since the last call; the directory itself means "rescan everything"
+        if self.fd is None:
+            snapshot = self.scan()
+            changed = {path for path in snapshot.keys() | self.snapshot.keys()
+                       if snapshot.get(path) != self.snapshot.get(path)}
+            self.snapshot = snapshot
+            return changed
+        changed = set()
+        while True:
+            try:
+                data = os.read(self.fd, 65536)
+            except BlockingIOError:
+                return changed
+            offset = 0
+            while offset < len(data):
+                wd, mask, _, length = EVENT_HEADER.unpack_from(data, offset)
+                offset += EVENT_HEADER.size
+                name = os.fsdecode(data[offset:offset + length].rstrip(b"\0"))
+                offset += length
+                directory = self.watches.get(wd)
+                if mask & IN_Q_OVERFLOW:
+                    changed.add(self.directory)
+                elif directory is None:
+                    continue  # a watch that was just dropped
+                elif mask & IN_IGNORED:
+                    del self.watches[wd]  # its directory is gone
+                elif mask & IN_ISDIR:
+                    # A directory came or went: watch new ones and let the owner rescan everything
+                    if mask & (IN_CREATE | IN_MOVED_TO) and not name.startswith("."):
+                        self.add_watches(self.fd, os.path.join(directory, name))
+                    changed.add(self.directory)
+                elif name.endswith(".nwd"):
+                    changed.add(os.path.join(directory, name))
+
+    def poll(self):
+        """Changed paths once events have been quiet for debounce seconds, otherwise an empty list."""
+        changed = self.collect()
+        now = time.monotonic()
+        if changed:
+            self.pending |= changed
+            self.last_event = now
+        if not self.pending or now - self.last_event < self.debounce:
+            return []
+        batch = sorted(self.pending)
+        self.pending = set()
+        return batch
@@ -1,29 +1,370 @@
+import functools
 import os
-from Chapter import Chapter
+import sqlite3
+import sys
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from Chapter import Chapter, METADATA_FIELDS
+from ChapterIndex import ChapterIndex
+from ChapterTable import ChapterTable
+from DirectoryWatcher import scan_tree
+from EditJournal import EditJournal
+from IntervalIndex import IntervalIndex
+from Tracer import tracer
+
+
+@tracer.traced("Chapter parse")
+def parse_chapter(path, lazy_synopsis=False):
+    # None when the file cannot be read right now, e.g. half written by novelWriter or deleted since the scan
+    try:
+        return Chapter(path, lazy_synopsis=lazy_synopsis)
+    except (OSError, ValueError) as e:
+        print(f"Could not read {path}: {e}")
+        return None
+
+
+def project_names(roots):
+    # novelWriter keeps the chapters in <project>/content, so the project is named after the folder above it
+    names = {}
+    for root in roots:
+        name = os.path.basename(root)
+        if name == "content":
+            name = os.path.basename(os.path.dirname(root)) or name
+        unique, count = name, 1
+        while unique in names.values():
+            count += 1
+            unique = f"{name} ({count})"
+        names[root] = unique
+    return names
+
 
 class Document:
-    def __init__(self, directory):
-        self.directory = directory
+    def __init__(self, roots, use_index=True, index_path=None, workers=None, use_processes=False,
+                 lazy_synopsis=False, use_journal=True, journal_path=None):
+        # roots: one content directory or a list of them, e.g. several books of a series on one timeline
+        # Absolute, so the paths kept in the index and the journal do not depend on the working directory
+        self.roots = [os.path.abspath(os.path.normpath(root)) for root in ([roots] if isinstance(roots, str) else roots)]
+        self.directory = self.roots[0]  # the index and the journal are kept next to the first root
+        self.projects = project_names(self.roots)  # root -> project name every chapter below it is tagged with
+        self.lazy_synopsis = lazy_synopsis  # keep synopses on disk until asked for, for very large projects
+        self.workers = workers  # None: one per cpu with processes, serial otherwise; 1: parse serially
+        self.use_processes = use_processes  # processes avoid the GIL for strptime-heavy projects
         self.chapters = []
+        self.chapters_by_path = {}
+        self.file_stats = {}  # path -> (mtime, size, inode) at the moment the file was parsed
+        self.index = None
+        self.journal = None  # edits not saved to the .nwd files yet
+        self.table = None  # columnar copy of self.chapters for vectorized filtering and layout
+        self.interval_index = None  # built on first rows_in_range(), dropped when dates change
+        self.version = 0  # bumped whenever dates or plots change, so views know their cached layout is stale
+        self.plot_groups_cache = (None, None)
+        if use_index:
+            try:
+                self.index = ChapterIndex(index_path or ChapterIndex.default_path(self.directory))
+                # Seed the stat cache from the index: read() then only re-parses stale entries
+                for path, (file_stat, chapter) in self.index.load().items():
+                    chapter.project = self.project_of(path)
+                    self.chapters_by_path[path] = chapter
+                    self.file_stats[path] = file_stat
+            except (sqlite3.Error, OSError, ValueError) as e:
+                print(f"Index not used: {e}")
+                self.index = None
+                self.chapters_by_path = {}
+                self.file_stats = {}
         self.read()
+        if use_journal:
+            self.journal = EditJournal(journal_path or EditJournal.default_path(self.directory))
+            try:
+                self.replay_journal()
+            except OSError as e:
+                print(f"Journal not used: {e}")
+                self.journal = None
 
 
+    @tracer.traced("Document.read")
     def read(self):
-        self.chapters = []
-        for filename in os.listdir(self.directory):
-            if filename.endswith(".nwd"):
-                path = os.path.join(self.directory, filename)
-                chapter = Chapter(path)
-                self.chapters.append(chapter)
+        # Only (re)parse files that are new or changed since the last read; unchanged chapters keep their identity.
+        # The roots are scanned side by side, the stale files of all of them are parsed in one go
+        chapters_by_path = {}
+        file_stats = {}
+        stale = []
+        found = {}
+        with ThreadPoolExecutor(max_workers=len(self.roots)) as executor:
+            for scanned in executor.map(scan_tree, self.roots):
+                found.update(scanned)
+        for path in sorted(found):
+            file_stat = found[path]
+            chapter = self.chapters_by_path.get(path)
+            if chapter is None or self.file_stats.get(path) != file_stat:
+                stale.append(path)
+            chapters_by_path[path] = chapter
+            file_stats[path] = file_stat
+        parsed = []
+        for path, chapter in zip(stale, self.parse_chapters(stale)):
+            previous = self.chapters_by_path.get(path)
+            if chapter is None:
+                # Keep what we had and its old fingerprint, so the next read tries again
+                if previous is None:
+                    del chapters_by_path[path], file_stats[path]
+                else:
+                    file_stats[path] = self.file_stats[path]
+                continue
+            if previous is not None and previous.dirty:
+                self.keep_unsaved(previous, chapter)
+                continue
+            chapters_by_path[path] = chapter  # slot was reserved above, so the sorted order is kept
+            parsed.append((file_stats[path], chapter))
+        removed = [path for path in self.chapters_by_path if path not in chapters_by_path]
+        self.chapters_by_path = chapters_by_path
+        self.file_stats = file_stats
+        self.chapters = list(chapters_by_path.values())
+        if parsed or removed or self.table is None:
+            self.table = ChapterTable(self.chapters)
+            self.interval_index = None
+            self.version += 1
+        self.update_index(parsed, removed)
 
+    def update_chapter(self, chapter, /, **fields):
+        # Edits go through the document so its indexes stay in sync; returns the names of the changed fields.
+        # chapter is positional-only because the name field is called chapter too
+        changed = self.apply_fields(chapter, fields)
+        if changed and self.journal is not None:
+            try:
+                self.journal.append(chapter.path, {name: fields[name] for name in changed})
+            except OSError as e:
+                print(f"Journal not updated: {e}")
+        return changed
 
-    def write(self):
+    def apply_fields(self, chapter, fields):
+        changed = {name for name, value in fields.items() if getattr(chapter, name) != value}
+        for name in changed:
+            setattr(chapter, name, fields[name])
+        if changed & {"startdate", "enddate", "plot", "pov", "char"}:
+            self.table.update(chapter)
+            self.version += 1
+        if changed & {"startdate", "enddate"}:
+            self.interval_index = None
+        return changed
+
+    def rows_in_range(self, start, end, mode="contained"):
+        """Table rows within [start, end] ("contained") or overlapping it ("overlapping"), by start date."""
+        if self.interval_index is None:
+            self.interval_index = IntervalIndex(self.table)
+        return self.interval_index.query(start, end, mode)
+
+    def chapters_in_range(self, start, end, mode="contained"):
+        return [self.table.chapters[row] for row in self.rows_in_range(start, end, mode)]
+
+    def plot_groups(self, start, end, mode="contained", projects=None, by_project=False):
+        """{plot: table rows sorted by start and end date} for the chapters in range, reused until data changes.
+
+        projects limits the rows to these project names; by_project groups per project and plot.
+        """
+        projects = tuple(projects) if projects is not None else None
+        key, plot_groups = self.plot_groups_cache
+        if key != (self.version, start, end, mode, projects, by_project):
+            rows = self.rows_in_range(start, end, mode)
+            if projects is not None:
+                codes = [self.table.codes["project"][name] for name in projects if name in self.table.codes["project"]]
+                rows = rows[np.isin(self.table.projects[rows], codes)]
+            plot_groups = self.table.plot_groups(rows, by_project)
+            self.plot_groups_cache = ((self.version, start, end, mode, projects, by_project), plot_groups)
+        return plot_groups
+
+    @tracer.traced("Document.read_paths")
+    def read_paths(self, paths):
+        """Bring only these files up to date, e.g. the ones a DirectoryWatcher reported.
+
+        Passing one of the roots itself falls back to a full read(). Returns True when anything changed.
+        """
+        if any(root in paths for root in self.roots):
+            self.read()
+            return True
+        stale = []
+        removed = []
+        for path in paths:
+            if not path.endswith(".nwd"):
+                continue
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                if path in self.chapters_by_path:
+                    removed.append(path)
+                continue
+            file_stat = (stat.st_mtime_ns, stat.st_size, stat.st_ino)
+            if self.file_stats.get(path) != file_stat:
+                stale.append((path, file_stat))
+        if not (stale or removed):
+            return False
+        for path in removed:
+            del self.chapters_by_path[path]
+            del self.file_stats[path]
+        parsed = []
+        replaced = []
+        for (path, file_stat), chapter in zip(stale, self.parse_chapters([path for path, _ in stale])):
+            if chapter is None:
+                continue  # the old chapter and fingerprint stay, the next event for the file tries again
+            self.file_stats[path] = file_stat
+            previous = self.chapters_by_path.get(path)
+            if previous is not None and previous.dirty:
+                self.keep_unsaved(previous, chapter)
+                continue
+            if previous is not None:
+                replaced.append((previous, chapter))
+            self.chapters_by_path[path] = chapter
+            parsed.append((file_stat, chapter))
+        if not (parsed or removed):
+            return False
+        added = len(parsed) > len(replaced)
+        if added:
+            self.chapters_by_path = dict(sorted(self.chapters_by_path.items()))
+        self.chapters = list(self.chapters_by_path.values())
+        if added or removed:
+            self.table = ChapterTable(self.chapters)
+        else:
+            for previous, chapter in replaced:
+                self.table.replace(previous, chapter)
+        self.interval_index = None
+        self.version += 1
+        self.update_index(parsed, removed)
+        return True
+
+    def parse_chapters(self, paths):
+        # Results come back in the order of paths, whatever order the workers finish in
+        # Threads only add overhead to this parse (the GIL), so without processes the default is serial
+        workers = self.workers or ((os.cpu_count() or 1) if self.use_processes else 1)
+        if workers <= 1 or len(paths) < 2:
+            chapters = [parse_chapter(path, self.lazy_synopsis) for path in paths]
+        else:
+            executor_class = ProcessPoolExecutor if self.use_processes else ThreadPoolExecutor
+            with executor_class(max_workers=workers) as executor:
+                # chunksize only matters for processes, where it saves pickling round trips
+                parse = functools.partial(parse_chapter, lazy_synopsis=self.lazy_synopsis)
+                chapters = list(executor.map(parse, paths, chunksize=max(1, len(paths) // (workers * 4))))
+        for chapter in chapters:
+            if chapter is not None:
+                chapter.project = self.project_of(chapter.path)
+        return chapters
+
+    def keep_unsaved(self, previous, chapter):
+        # The file changed on disk while previous has unsaved edits. Those win: previous stays, and the next
+        # save writes its metadata into the new file. A synopsis that was never loaded is taken from the new
+        # file, the old offset points into the old one
+        print(f"{previous.path} changed on disk, its unsaved edits are kept")
+        if previous.stored_synopsis()[0] is None:
+            try:
+                chapter.snapshot()  # loads the synopsis from the new file
+            except OSError as e:
+                print(f"Error: {e}")
+                return  # the old offset stays, read_synopsis() re-parses the file when it does not fit anymore
+            previous.synopsis = chapter.synopsis
+            previous.synopsis_offset = None
+
+    def project_of(self, path):
+        # The deepest root the file is in, roots can be nested
+        best = None
+        for root in self.roots:
+            if path.startswith(root + os.sep) and (best is None or len(root) > len(best)):
+                best = root
+        return self.projects.get(best, "")
+
+    def update_index(self, entries, removed=()):
+        if self.index is None or not (entries or removed):
+            return
+        try:
+            self.index.update(entries, removed)
+        except sqlite3.Error as e:
+            print(f"Index not updated: {e}")
+
+
+    def snapshot(self):
+        # [(chapter, metadata)] of every dirty chapter, which count as saved from here on.
+        # Edits made after this mark them dirty again
+        snapshot = []
+        for chapter in self.chapters:
+            if chapter.dirty:
+                try:
+                    snapshot.append((chapter, chapter.snapshot()))
+                except OSError as e:
+                    print(f"Not saved yet, the synopsis of {chapter.path} could not be read: {e}")
+                    continue  # stays dirty, the next save tries again
+                chapter.dirty = False
+        return snapshot
+
+    @tracer.traced("Document.write")
+    def write_snapshot(self, snapshot, progress=None):
+        """Write a snapshot() to disk; safe to run on another thread, the chapters themselves are not touched.
+
+        Returns (written, failures): the chapters whose file changed and (chapter, error) for every file
+        that could not be written. progress(done, total) is called after each file.
+        """
+        written = []
+        failures = []
+        for done, (chapter, metadata) in enumerate(snapshot, 1):
+            try:
+                if chapter.write(metadata):
+                    written.append(chapter)
+            except Exception as e:  # one bad file must not cost the rest of the save
+                failures.append((chapter, e))
+            if progress is not None:
+                progress(done, len(snapshot))
+        return written, failures
+
+    def finish_write(self, written, failures):
+        # Back on the thread that owns the document, once write_snapshot() is done
+        for chapter in written:
+            # Our own write: remember the new fingerprint so the watcher or the next read() does not re-parse
+            # the file. A re-parse would lose what is only in memory, like a new name (written to the heading,
+            # not to %%~name) or an edit made while the save was running
+            try:
+                stat = os.stat(chapter.path)
+                self.file_stats[chapter.path] = (stat.st_mtime_ns, stat.st_size, stat.st_ino)
+            except FileNotFoundError:
+                pass
+        for chapter, error in failures:
+            chapter.dirty = True  # still to be saved
+        self.compact_journal()
+
+    def replay_journal(self):
+        # Edits that were journaled but never saved, e.g. because of a crash, become unsaved edits again
+        replayed = 0
+        for path, fields in self.journal.load():
+            chapter = self.chapters_by_path.get(path)
+            if chapter is None:
+                print(f"Journaled edit of {path} dropped, the file is gone")
+                continue
+            if self.apply_fields(chapter, fields):
+                replayed += 1
+        if replayed:
+            print(f"Restored {replayed} unsaved edit(s) from {self.journal.path}")
+
+    def compact_journal(self):
+        # After a save only the edits that are still unsaved are kept, one record per chapter
+        if self.journal is None:
+            return
+        entries = [(chapter.path, self.unsaved_fields(chapter)) for chapter in self.chapters if chapter.dirty]
+        if not entries and not self.journal.records:
+            return
         try:
-            for chapter in self.chapters:
-                chapter.write()
-        except KeyError as e:
-            print(f"Error: {e}")
-            print(chapter)
+            self.journal.rewrite(entries)
+        except OSError as e:
+            print(f"Journal not compacted: {e}")
+
+    @staticmethod
+    def unsaved_fields(chapter):
+        # A synopsis still only in the file was not edited and is left out: it would take a read that can fail
+        fields = {field: getattr(chapter, field) for field in METADATA_FIELDS if field != "synopsis"}
+        if chapter.stored_synopsis()[0] is not None:
+            fields["synopsis"] = chapter.synopsis
+        return fields
+
+    def write(self):
+        # Only dirty chapters are rewritten; returns the number of files that actually changed on disk
+        written, failures = self.write_snapshot(self.snapshot())
+        self.finish_write(written, failures)
+        for chapter, error in failures:
+            print(f"Could not save {chapter.path}: {error}")
+        return len(written)
 
     def __str__(self):
         res = ""
@@ -33,9 +374,10 @@ class Document:
 
 
 def main():
-    directory_path = "/home/willem/Documents/Eigen maaksels/Verhalen staan buiten bin en in dropbox/radio controlled/content"
-    document = Document(directory_path)
-    document.read()
+    if len(sys.argv) < 2:
+        print("usage: Document.py <content directory> [<content directory> ...]")
+        return
+    document = Document(sys.argv[1:])
     print(document)
     document.write()
 
@@ -0,0 +1,83 @@
+import json
+import os
+import tempfile
+from datetime import date
+
+# Fields stored as ISO dates in the journal
+DATE_FIELDS = ("startdate", "enddate")
+# Only the data has to reach the disk, the file's metadata can lag behind; macOS and Windows only have fsync
+fdatasync = getattr(os, "fdatasync", os.fsync)
+
+
+class EditJournal:
+    """Append-only log of chapter edits that are not in the .nwd files yet, one JSON line per edit.
+
+    append() fsyncs every record, so an edit survives a crash as soon as it is made. After a save the
+    journal is rewritten with whatever is still unsaved (compaction); on startup the records are replayed.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.file = None  # opened for appending on the first edit
+        self.records = 0  # number of records in the journal
+
+    @staticmethod
+    def default_path(directory):
+        # Next to the content directory like the index, novelWriter does not look there
+        return os.path.join(os.path.dirname(os.path.normpath(directory)), "timeline_journal.jsonl")
+
+    @staticmethod
+    def encode(path, fields):
+        values = {name: value.isoformat() if name in DATE_FIELDS else value for name, value in fields.items()}
+        return json.dumps({"path": path, "fields": values}, ensure_ascii=False) + "\n"
+
+    def load(self):
+        """Return [(path, fields)] in the order the edits were made; a torn last line from a crash is skipped."""
+        entries = []
+        try:
+            with open(self.path, "r", encoding="utf-8") as file:
+                for line in file:
+                    try:
+                        record = json.loads(line)
+                        fields = {name: date.fromisoformat(value) if name in DATE_FIELDS else value
+                                  for name, value in record["fields"].items()}
+                    except (ValueError, KeyError, TypeError):
+                        print(f"Journal line skipped: {line.strip()[:80]}")
+                        continue
+                    entries.append((record["path"], fields))
+        except FileNotFoundError:
+            pass
+        self.records = len(entries)
+        return entries
+
+    def append(self, path, fields):
+        if self.file is None:
+            self.file = open(self.path, "a", encoding="utf-8")
+            if self.file.tell() and not self.ends_with_newline():
+                self.file.write("\n")  # close off a line torn by a crash, or the next record is lost with it
+        self.file.write(self.encode(path, fields))
+        self.file.flush()
+        fdatasync(self.file.fileno())
+        self.records += 1
+
+    def ends_with_newline(self):
+        with open(self.path, "rb") as file:
+            file.seek(-1, os.SEEK_END)
+            return file.read(1) == b"\n"
+
+    def rewrite(self, entries):
+        # Replace the journal by these [(path, fields)] in one go: a crash leaves either the old or the new one
+        self.close()
+        with tempfile.NamedTemporaryFile("w", encoding="utf-8", dir=os.path.dirname(os.path.abspath(self.path)),
+                                         prefix=".", suffix=".tmp", delete=False) as target:
+            for path, fields in entries:
+                target.write(self.encode(path, fields))
+            target.flush()
+            os.fsync(target.fileno())
+        os.replace(target.name, self.path)
+        self.records = len(entries)
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+            self.file = None
@@ -0,0 +1,37 @@
+import numpy as np
+
+
+class IntervalIndex:
+    """Rows of a ChapterTable sorted by start ordinal, answering date-range queries in O(log n + k).
+
+    Besides the sorted starts it keeps the longest chapter duration: a chapter starting more than
+    that many days before a boundary cannot cross it, so only the few chapters near a boundary
+    have to have their end checked.
+    """
+
+    def __init__(self, table):
+        self.order = np.argsort(table.starts, kind="stable")
+        self.starts = table.starts[self.order]
+        self.ends = table.ends[self.order]
+        lengths = self.ends - self.starts
+        self.max_length = int(lengths.max()) if len(lengths) else 0
+        self.backwards = bool((lengths < 0).any())  # an end before its start breaks the "starts late enough" shortcut
+
+    def query(self, start, end, mode="contained"):
+        """Rows within [start, end] ("contained") or touching it ("overlapping"), ordered by start date."""
+        first, last = start.toordinal(), end.toordinal()
+        if mode == "contained":
+            # start >= first and end <= last; starting no later than last - max_length guarantees the end
+            low = np.searchsorted(self.starts, first, "left")
+            high = len(self.starts) if self.backwards else np.searchsorted(self.starts, last, "right")
+            middle = low if self.backwards else max(low, np.searchsorted(self.starts, last - self.max_length, "right"))
+            indices = np.concatenate([np.arange(low, middle), middle + np.flatnonzero(self.ends[middle:high] <= last)])
+        elif mode == "overlapping":
+            # start <= last and end >= first; starting at or after first guarantees the end
+            high = np.searchsorted(self.starts, last, "right")
+            low = 0 if self.backwards else np.searchsorted(self.starts, first - self.max_length, "left")
+            middle = high if self.backwards else min(high, np.searchsorted(self.starts, first, "left"))
+            indices = np.concatenate([low + np.flatnonzero(self.ends[low:middle] >= first), np.arange(middle, high)])
+        else:
+            raise ValueError(f"Unknown mode: {mode}")
+        return self.order[indices]
@@ -0,0 +1,29 @@
+from PyQt5.QtCore import QTimer
+
+
+class RenderScheduler:
+    """Coalesces redraw requests: every request() until the next frame tick results in a single render()."""
+
+    def __init__(self, render, frame_ms=16):
+        self.render = render
+        self.requested = 0  # calls to request()
+        self.performed = 0  # renders actually done
+        self.timer = QTimer()
+        self.timer.setSingleShot(True)
+        self.timer.setInterval(frame_ms)
+        self.timer.timeout.connect(self.flush)
+
+    def request(self):
+        # Marks the view dirty; the render happens once the event loop reaches the next tick
+        self.requested += 1
+        if not self.timer.isActive():
+            self.timer.start()
+
+    def flush(self):
+        # Render now, dropping anything that was still pending
+        self.timer.stop()
+        self.performed += 1
+        self.render()
+
+    def pending(self):
+        return self.timer.isActive()
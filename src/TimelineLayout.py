@@ -0,0 +1,177 @@
+import datetime
+import functools
+import heapq
+import numpy as np
+import matplotlib.dates as mdates
+from matplotlib.backends.backend_agg import RendererAgg
+from matplotlib.font_manager import FontProperties
+from Tracer import tracer
+
+BAR_HEIGHT = 0.3
+LANE_HEIGHT = 1 / 3  # vertical distance between the sub-lanes of a plot
+PLOT_GAP = 1  # empty lanes between two plots
+LABEL_PADDING = 2  # pixels kept free on both sides of a label inside its bar
+ELLIPSIS = "\u2026"
+
+
+def date_num_offset():
+    # date2num(d) == d.toordinal() + offset, so whole arrays of ordinals convert with one addition
+    reference = datetime.date(2000, 1, 1)
+    return mdates.date2num(reference) - reference.toordinal()
+
+
+def day_to_num(day):
+    return day + date_num_offset()
+
+
+def num_to_date(num):
+    # Inverse of date2num for whole days, e.g. slider positions
+    return datetime.date.fromordinal(int(num - date_num_offset()))
+
+
+@functools.lru_cache(maxsize=None)
+def measuring_renderer(dpi):
+    return RendererAgg(1, 1, dpi)
+
+
+@functools.lru_cache(maxsize=65536)
+def text_width(text, fontsize, dpi):
+    # Pixel width of a label; laying out text is expensive and the same names come back every redraw
+    width, _, _ = measuring_renderer(dpi).get_text_width_height_descent(text, FontProperties(size=fontsize), False)
+    return width
+
+
+def fit_label(text, fontsize, dpi, room):
+    """The label, or its longest prefix plus an ellipsis, that fits in room pixels; None if nothing fits."""
+    if text_width(text, fontsize, dpi) <= room:
+        return text
+    low, high = 0, len(text) - 1  # find the longest prefix that still fits with the ellipsis
+    while low < high:
+        middle = (low + high + 1) // 2
+        if text_width(text[:middle] + ELLIPSIS, fontsize, dpi) <= room:
+            low = middle
+        else:
+            high = middle - 1
+    return text[:low].rstrip() + ELLIPSIS if low else None
+
+
+def pack_lanes(starts, ends):
+    """Lowest free lane for every interval with a sweep over the starts; returns (lanes, number of lanes)."""
+    lanes = [0] * len(starts)
+    running = []  # (end, lane) of intervals that have started
+    free = []  # lanes given back, lowest first
+    count = 0
+    for i in sorted(range(len(starts)), key=starts.__getitem__):
+        while running and running[0][0] <= starts[i]:
+            heapq.heappush(free, heapq.heappop(running)[1])
+        if free:
+            lane = heapq.heappop(free)
+        else:
+            lane = count
+            count += 1
+        lanes[i] = lane
+        heapq.heappush(running, (ends[i], lane))
+    return lanes, count
+
+
+class TimelineLayout:
+    """Bar geometry for the plot groups of one redraw, as flat arrays with one entry per bar."""
+
+    @tracer.traced("layout")
+    def __init__(self, table, plot_groups):
+        # plot_groups maps a plot name to ChapterTable rows sorted by date, see ChapterTable.plot_groups.
+        # A layout only depends on them, so a view can keep it as long as it gets the same plot_groups back.
+        self.table = table
+        self.plot_groups = plot_groups
+        self.plot_list = sorted(list(plot_groups.keys()), reverse=True)
+        groups = [np.asarray(plot_groups[plot], dtype=np.int64) for plot in self.plot_list]
+        self.rows = np.concatenate(groups) if groups else np.zeros(0, dtype=np.int64)
+        # Every chapter gets the lowest sub-lane of its plot that is free at its start; a plot is as
+        # high as the number of lanes it needs, lanes are stacked from the bottom plot upwards
+        lanes = []
+        self.plot_ticks = []
+        base = 0
+        for group in groups:
+            x0 = np.minimum(table.starts[group], table.ends[group]).tolist()
+            x1 = np.maximum(table.starts[group], table.ends[group]).tolist()
+            group_lanes, count = pack_lanes(x0, x1)
+            lanes.append(np.array(group_lanes, dtype=np.int64) + base)
+            self.plot_ticks.append(LANE_HEIGHT * (base + (count + 1) / 2))
+            base += count + PLOT_GAP
+        self.positions = LANE_HEIGHT * ((np.concatenate(lanes) if lanes else np.zeros(0)) + 1)
+        starts = table.starts[self.rows]
+        self.lefts = starts + date_num_offset()
+        self.widths = (table.ends[self.rows] - starts).astype(float)
+        self.build_hit_index()
+
+    def __len__(self):
+        return len(self.rows)
+
+    def chapter(self, index):
+        return self.table.chapters[self.rows[index]]
+
+    def label(self, index):
+        return self.table.chapters[self.rows[index]].chapter
+
+    def bar_indices(self, chapter):
+        # A chapter with several plots has several bars
+        row = self.table.rows.get(chapter)
+        return np.flatnonzero(self.rows == row) if row is not None else np.zeros(0, dtype=np.int64)
+
+    def bar_vertices(self):
+        # (n, 4, 2) corners in the same place ax.barh(position, width, BAR_HEIGHT, left=left) puts them
+        left = self.lefts
+        right = self.lefts + self.widths
+        bottom = self.positions - BAR_HEIGHT / 2
+        top = self.positions + BAR_HEIGHT / 2
+        return np.stack([
+            np.column_stack([left, bottom]),
+            np.column_stack([left, top]),
+            np.column_stack([right, top]),
+            np.column_stack([right, bottom]),
+        ], axis=1)
+
+    def build_hit_index(self):
+        # Bars grouped per lane (y position) and sorted by their left edge, so a click needs two binary searches
+        x0 = np.minimum(self.lefts, self.lefts + self.widths)
+        x1 = np.maximum(self.lefts, self.lefts + self.widths)
+        self.hit_order = np.lexsort((x0, self.positions))
+        self.hit_x0 = x0[self.hit_order]
+        self.hit_x1 = x1[self.hit_order]
+        self.lane_positions, self.lane_starts = np.unique(self.positions[self.hit_order], return_index=True)
+        self.lane_ends = np.append(self.lane_starts[1:], len(self.hit_order))
+        widths = self.hit_x1 - self.hit_x0
+        self.lane_max_widths = np.maximum.reduceat(widths, self.lane_starts) if len(widths) else widths
+
+    @tracer.traced("hit_test")
+    def hit_test(self, x, y):
+        """Index of the bar under data point (x, y), or None. Overlapping bars resolve to the lowest index."""
+        lane = np.searchsorted(self.lane_positions, y)
+        for candidate in (lane - 1, lane):
+            if 0 <= candidate < len(self.lane_positions) and abs(self.lane_positions[candidate] - y) <= BAR_HEIGHT / 2:
+                lane = candidate
+                break
+        else:
+            return None
+        start, end = self.lane_starts[lane], self.lane_ends[lane]
+        # Only bars starting within the widest bar of the lane before x can still reach x
+        first = start + np.searchsorted(self.hit_x0[start:end], x - self.lane_max_widths[lane], "left")
+        last = start + np.searchsorted(self.hit_x0[start:end], x, "right")
+        hits = self.hit_order[first:last][self.hit_x1[first:last] >= x]
+        return int(hits.min()) if len(hits) else None
+
+    def label_positions(self):
+        return self.lefts + self.widths / 2, self.positions
+
+    def fitted_labels(self, x_min, x_max, y_min, y_max, pixel_width, fontsize, dpi):
+        """(x, y, text) for every bar in view whose label, possibly ellipsized, fits inside it on screen."""
+        centers, positions = self.label_positions()
+        x0 = np.minimum(self.lefts, self.lefts + self.widths)
+        x1 = np.maximum(self.lefts, self.lefts + self.widths)
+        room = (x1 - x0) * pixel_width / (x_max - x_min) - 2 * LABEL_PADDING
+        in_view = ((x1 >= x_min) & (x0 <= x_max) &
+                   (positions + BAR_HEIGHT / 2 >= y_min) & (positions - BAR_HEIGHT / 2 <= y_max))
+        for index in np.flatnonzero(in_view & (room > 0)):
+            text = fit_label(self.label(index), fontsize, dpi, room[index])
+            if text:
+                yield centers[index], positions[index], text
@@ -0,0 +1,143 @@
+import atexit
+import functools
+import json
+import multiprocessing
+import os
+import threading
+import time
+from collections import deque
+
+# Set TIMELINE_TRACE=/path/trace.json to record spans and write a Chrome trace (chrome://tracing, Perfetto) at exit
+
+
+class Span:
+    __slots__ = ("tracer", "name", "start")
+
+    def __init__(self, tracer, name):
+        self.tracer = tracer
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, *exc):
+        self.tracer.record(self.name, self.start, time.perf_counter_ns() - self.start)
+        return False
+
+
+class NullSpan:
+    # What span() hands out while tracing is off: no clock reads, nothing stored
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+NULL_SPAN = NullSpan()
+
+
+class Tracer:
+    """Named timing spans. Disabled it costs one attribute check per span; enabled it keeps the last
+    `window` durations per name for count/p50/p95/max and the last `max_events` spans for a trace export."""
+
+    def __init__(self, window=1000, max_events=100000):
+        self.enabled = False
+        self.window = window
+        self.lock = threading.Lock()
+        self.durations = {}  # name -> deque of the latest durations in ns
+        self.totals = {}  # name -> (count, max ns) since enable()
+        self.events = deque(maxlen=max_events)  # (name, start ns, duration ns, thread id)
+
+    def enable(self):
+        self.enabled = True
+
+    def disable(self):
+        self.enabled = False
+
+    def clear(self):
+        with self.lock:
+            self.durations = {}
+            self.totals = {}
+            self.events.clear()
+
+    def span(self, name):
+        # with tracer.span("name"): ...
+        if not self.enabled:
+            return NULL_SPAN
+        return Span(self, name)
+
+    def traced(self, name):
+        # Decorator version of span() for whole functions
+        def decorate(func):
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return func(*args, **kwargs)
+                with Span(self, name):
+                    return func(*args, **kwargs)
+            return wrapper
+        return decorate
+
+    def record(self, name, start, duration):
+        with self.lock:
+            durations = self.durations.get(name)
+            if durations is None:
+                durations = self.durations[name] = deque(maxlen=self.window)
+            durations.append(duration)
+            count, longest = self.totals.get(name, (0, 0))
+            self.totals[name] = (count + 1, max(longest, duration))
+            self.events.append((name, start, duration, threading.get_ident()))
+
+    def stats(self):
+        # name -> count, p50, p95 (over the window) and max, in milliseconds
+        with self.lock:
+            snapshot = {name: sorted(durations) for name, durations in self.durations.items()}
+            totals = dict(self.totals)
+        stats = {}
+        for name, durations in snapshot.items():
+            count, longest = totals[name]
+            stats[name] = {
+                "count": count,
+                "p50": durations[(len(durations) - 1) // 2] / 1e6,
+                "p95": durations[min(len(durations) - 1, int(len(durations) * 0.95))] / 1e6,
+                "max": longest / 1e6,
+            }
+        return stats
+
+    def summary(self):
+        lines = [f"{'span':32} {'count':>8} {'p50 ms':>10} {'p95 ms':>10} {'max ms':>10}"]
+        for name, stat in sorted(self.stats().items()):
+            lines.append(f"{name:32} {stat['count']:8} {stat['p50']:10.3f} {stat['p95']:10.3f} {stat['max']:10.3f}")
+        return "\n".join(lines)
+
+    def export(self, path):
+        # Chrome trace event format: complete events ("X") with microsecond timestamps, plus the statistics
+        with self.lock:
+            events = list(self.events)
+        pid = os.getpid()
+        trace = {
+            "traceEvents": [{"name": name, "ph": "X", "ts": start / 1000, "dur": duration / 1000, "pid": pid, "tid": tid}
+                            for name, start, duration, tid in events],
+            "displayTimeUnit": "ms",
+            "stats": self.stats(),
+        }
+        with open(path, "w", encoding="utf-8") as file:
+            json.dump(trace, file)
+
+
+tracer = Tracer()
+
+
+def export_at_exit(path):
+    print(tracer.summary())
+    tracer.export(path)
+    print(f"Trace written to {path}")
+
+
+if os.environ.get("TIMELINE_TRACE") and multiprocessing.parent_process() is None:  # not in parse workers
+    tracer.enable()
+    atexit.register(export_at_exit, os.environ["TIMELINE_TRACE"])
@@ -0,0 +1,159 @@
+import argparse
+import json
+import os
+import platform
+import random
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")  # headless: the Qt canvas still renders with Agg
+
+from Document import Document
+from generate_project import generate_project
+
+# Benchmarks on generated projects; results go to a JSON file so runs can be compared over time.
+# python benchmark.py --sizes 100,1000,10000 --output benchmark_results.json
+
+
+def measure(func, repeat, setup=None):
+    # Seconds per call: best, median and mean over repeat calls. setup runs untimed before every call
+    times = []
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    return {"repeat": repeat, "min": min(times), "median": statistics.median(times), "mean": statistics.fmean(times)}
+
+
+def bench_document(content, index_path, repeat):
+    results = {}
+    results["Document.read cold"] = measure(lambda: Document(content, use_index=False), repeat)
+    results["Document.read cold processes"] = measure(lambda: Document(content, use_index=False,
+                                                                       use_processes=True), repeat)
+    Document(content, index_path=index_path)  # fill the index
+    results["Document.read from index"] = measure(lambda: Document(content, index_path=index_path), repeat)
+    document = Document(content, use_index=False)
+    results["Document.read unchanged"] = measure(document.read, repeat)
+    return results, document
+
+
+def bench_write(document, repeat, sample=100):
+    chapters = random.Random(2).sample(document.chapters, min(sample, len(document.chapters)))
+    count = [0]
+
+    def edit():
+        count[0] += 1
+        for chapter in chapters:
+            chapter.synopsis = f"Benchmark edit {count[0]}"
+
+    def write_all():
+        for chapter in chapters:
+            chapter.write()
+
+    results = {}
+    per_file = lambda stats: {**stats, **{key: stats[key] / len(chapters) for key in ("min", "median", "mean")}}
+    results["Chapter.write changed"] = per_file(measure(write_all, repeat, setup=edit))
+    results["Chapter.write unchanged"] = per_file(measure(write_all, repeat))
+    return results
+
+
+def bench_editor(content, repeat, windows=50):
+    from PyQt5.QtWidgets import QApplication
+    app = QApplication.instance() or QApplication(sys.argv)
+    import timeline_form  # after the QApplication, the Qt5Agg backend needs it
+
+    editor = timeline_form.chapterTimelineEditor(content, watch=False)
+    editor.resize(1600, 1200)
+    editor.show()
+    app.processEvents()
+    results = {}
+
+    # Random date windows, all different so the plot group cache never answers
+    rng = random.Random(3)
+    first = min(chapter.startdate for chapter in editor.document.chapters)
+    last = max(chapter.enddate for chapter in editor.document.chapters)
+    span = (last - first).days
+
+    def plot_groups():
+        for _ in range(windows):
+            start = first + timedelta(days=rng.randint(0, span))
+            editor.create_plot_groups(start, start + timedelta(days=rng.randint(1, span)))
+
+    stats = measure(plot_groups, repeat)
+    results["create_plot_groups"] = {**stats, **{key: stats[key] / windows for key in ("min", "median", "mean")}}
+
+    def reset_layout():
+        editor.timeline_layout = None
+
+    results["update_timeline new layout"] = measure(editor.update_timeline, repeat, setup=reset_layout)
+    results["update_timeline"] = measure(editor.update_timeline, repeat)
+
+    # Clicks: half of them in the middle of a bar, half anywhere in the axes
+    layout = editor.timeline_layout
+    ax = editor.bar_collection.axes
+    (x_min, x_max), (y_min, y_max) = ax.get_xlim(), ax.get_ylim()
+    clicks = []
+    for i in range(1000):
+        if i % 2 and len(layout):
+            index = rng.randrange(len(layout))
+            clicks.append((layout.lefts[index] + layout.widths[index] / 2, layout.positions[index]))
+        else:
+            clicks.append((rng.uniform(x_min, x_max), rng.uniform(y_min, y_max)))
+
+    def hit_test():
+        for x, y in clicks:
+            layout.hit_test(x, y)
+
+    stats = measure(hit_test, repeat)
+    results["hit_test"] = {**stats, **{key: stats[key] / len(clicks) for key in ("min", "median", "mean")}}
+    editor.close()
+    return results
+
+
+def run(sizes, repeat, output, gui=True):
+    report = {
+        "date": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "results": [],
+    }
+    for count in sizes:
+        work = tempfile.mkdtemp(prefix="timeline_bench_")
+        try:
+            content = os.path.join(work, "content")
+            generate_project(content, count)
+            print(f"{count} chapters")
+            results, document = bench_document(content, os.path.join(work, "index.sqlite"), repeat)
+            results.update(bench_write(document, repeat))
+            if gui:
+                results.update(bench_editor(content, repeat))
+        finally:
+            shutil.rmtree(work, ignore_errors=True)
+        for name, stats in results.items():
+            print(f"  {name:32} {stats['median'] * 1000:10.3f} ms")
+            report["results"].append({"name": name, "chapters": count, **stats})
+    with open(output, "w", encoding="utf-8") as file:
+        json.dump(report, file, indent=2)
+    print(f"Results written to {output}")
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Timeline editor benchmarks on generated projects")
+    parser.add_argument("--sizes", default="100,1000,10000", help="comma separated chapter counts, up to 100000")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--output", default="benchmark_results.json")
+    parser.add_argument("--no-gui", action="store_true", help="skip the editor benchmarks")
+    args = parser.parse_args()
+    run([int(size) for size in args.sizes.split(",")], args.repeat, args.output, gui=not args.no_gui)
+
+
+if __name__ == "__main__":
+    main()
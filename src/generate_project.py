@@ -0,0 +1,67 @@
+import os
+import random
+import sys
+from datetime import date, datetime, timedelta
+
+# Synthetic novelWriter project for benchmarks: N .nwd files with the header lines Chapter reads
+PLOTS = ["Main", "Radio", "Harbour", "Family", "Trial", "Flashback", "Letters", "Storm"]
+PEOPLE = ["Anna", "Bram", "Chris", "Dirk", "Eva", "Femke", "Gerrit", "Hanna", "Ivo", "Joost", "Kees", "Lotte"]
+WORDS = ("de het een en van in op dat niet met voor zijn was er aan maar ook als bij nog door naar om over "
+         "radio signaal haven nacht schip licht stem zender kust brief wind regen deur trap kamer").split()
+
+
+def prose(rng, paragraphs):
+    text = []
+    for _ in range(paragraphs):
+        words = [rng.choice(WORDS) for _ in range(rng.randint(20, 120))]
+        text.append(" ".join(words).capitalize() + ".\n\n")
+    return "".join(text)
+
+
+def chapter_text(rng, index, first_day, span_days):
+    name = f"Scene {index}"
+    start = first_day + timedelta(days=rng.randint(0, span_days))
+    end = start + timedelta(days=rng.randint(1, 14))
+    plots = rng.sample(PLOTS, 2 if rng.random() < 0.15 else 1)  # some scenes belong to two plots
+    pov = rng.choice(PEOPLE)
+    chars = ", ".join(rng.sample(PEOPLE, rng.randint(1, 4)))
+    stamp = datetime(2024, 1, 1) + timedelta(minutes=rng.randint(0, 500000))
+    return (f"%%~name: {name}\n"
+            f"%%~path: {rng.getrandbits(52):013x}/{rng.getrandbits(52):013x}\n"
+            f"%%~kind: NOVEL/DOCUMENT\n"
+            f"%%~hash: {rng.getrandbits(160):040x}\n"
+            f"%%~date: {stamp:%Y-%m-%d %H:%M:%S}/{stamp + timedelta(days=3):%Y-%m-%d %H:%M:%S}\n"
+            f"## {name}\n\n"
+            f"@plot: {', '.join(plots)}\n"
+            f"@pov: {pov}\n"
+            f"@char: {chars}\n"
+            f"@time: {start}\n"
+            f"@time: {end}\n\n"
+            f"% Synopsis: {' '.join(rng.choice(WORDS) for _ in range(rng.randint(8, 30)))}\n\n"
+            + prose(rng, rng.randint(5, 40)))
+
+
+def generate_project(directory, count, seed=1, first_day=date(2022, 1, 1), span_days=730):
+    # Writes count chapters with novelWriter style names (13 hex digits) into directory, same seed same project
+    rng = random.Random(seed)
+    os.makedirs(directory, exist_ok=True)
+    paths = []
+    for index in range(count):
+        path = os.path.join(directory, f"{rng.getrandbits(52):013x}.nwd")
+        with open(path, "w", encoding="utf-8") as file:
+            file.write(chapter_text(rng, index, first_day, span_days))
+        paths.append(path)
+    return paths
+
+
+def main():
+    if len(sys.argv) < 3:
+        print("usage: generate_project.py <content directory> <number of chapters> [seed]")
+        return
+    seed = int(sys.argv[3]) if len(sys.argv) > 3 else 1
+    paths = generate_project(sys.argv[1], int(sys.argv[2]), seed)
+    print(f"Wrote {len(paths)} chapters to {sys.argv[1]}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,42 @@
+import random
+import unittest
+from datetime import date, timedelta
+from Chapter import Chapter
+from ChapterTable import ChapterTable
+
+PLOTS = ["Main", "Radio", "Harbour", "Main, Radio", "Radio, Storm", ""]
+
+
+def groups_by_name(table):
+    # Codes differ between tables, names do not; plots whose last chapter moved away keep an empty group
+    return {table.plot_names[plot]: group.tolist() for plot, group in table.groups.items() if len(group)}
+
+
+class TestUpdate(unittest.TestCase):
+    def test_incremental_groups_match_a_fresh_table(self):
+        rng = random.Random(5)
+        first = date(2022, 1, 1)
+        for _ in range(20):
+            chapters = []
+            for index in range(rng.randint(1, 40)):
+                # Few distinct days so equal starts and ends, where the row number breaks ties, are common
+                start = first + timedelta(days=rng.randint(0, 10))
+                chapters.append(Chapter.from_fields(f"{index}.nwd", f"Scene {index}", rng.choice(PLOTS), "", "", "",
+                                                    start, start + timedelta(days=rng.randint(0, 3))))
+            table = ChapterTable(chapters)
+            for _ in range(30):
+                chapter = rng.choice(chapters)
+                edit = rng.choice(["startdate", "enddate", "plot"])
+                if edit == "plot":
+                    chapter.plot = rng.choice(PLOTS)
+                else:
+                    setattr(chapter, edit, first + timedelta(days=rng.randint(0, 12)))
+                table.update(chapter)
+                fresh = ChapterTable(chapters)
+                self.assertEqual(groups_by_name(table), groups_by_name(fresh))
+                self.assertEqual(table.starts.tolist(), fresh.starts.tolist())
+                self.assertEqual(table.ends.tolist(), fresh.ends.tolist())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,51 @@
+import random
+import unittest
+from datetime import date, timedelta
+from Chapter import Chapter
+from ChapterTable import ChapterTable
+from IntervalIndex import IntervalIndex
+
+
+def random_table(rng, count, backwards):
+    first = date(2022, 1, 1)
+    chapters = []
+    for index in range(count):
+        start = first + timedelta(days=rng.randint(0, 100))
+        length = rng.randint(-5 if backwards else 0, 30)
+        chapters.append(Chapter.from_fields(f"{index}.nwd", f"Scene {index}", "Main", "", "", "",
+                                            start, start + timedelta(days=length)))
+    return ChapterTable(chapters)
+
+
+def brute_force_query(table, start, end, mode):
+    first, last = start.toordinal(), end.toordinal()
+    if mode == "contained":
+        rows = [row for row in range(len(table)) if table.starts[row] >= first and table.ends[row] <= last]
+    else:
+        rows = [row for row in range(len(table)) if table.starts[row] <= last and table.ends[row] >= first]
+    # Ordered by start date, equal starts in row order
+    return sorted(rows, key=lambda row: (table.starts[row], row))
+
+
+class TestQuery(unittest.TestCase):
+    def test_matches_brute_force(self):
+        rng = random.Random(7)
+        for backwards in (False, True):
+            for _ in range(30):
+                table = random_table(rng, rng.randint(0, 80), backwards)
+                index = IntervalIndex(table)
+                for _ in range(30):
+                    start = date(2021, 12, 1) + timedelta(days=rng.randint(0, 160))
+                    end = start + timedelta(days=rng.randint(-2, 60))
+                    for mode in ("contained", "overlapping"):
+                        self.assertEqual(index.query(start, end, mode).tolist(),
+                                         brute_force_query(table, start, end, mode), (start, end, mode, backwards))
+
+    def test_unknown_mode(self):
+        index = IntervalIndex(random_table(random.Random(1), 5, False))
+        with self.assertRaises(ValueError):
+            index.query(date(2022, 1, 1), date(2022, 2, 1), "inside")
+
+
+if __name__ == "__main__":
+    unittest.main()
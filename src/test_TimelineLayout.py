@@ -0,0 +1,57 @@
+import random
+import unittest
+from datetime import date, timedelta
+from Chapter import Chapter
+from ChapterTable import ChapterTable
+from TimelineLayout import BAR_HEIGHT, TimelineLayout
+
+PLOTS = ["Main", "Radio", "Harbour", "Main, Radio", ""]
+
+
+def random_chapters(rng, count):
+    # Short spans on a small range of days so bars overlap, share edges and stack into several lanes;
+    # a few end before they start
+    first = date(2022, 1, 1)
+    chapters = []
+    for index in range(count):
+        start = first + timedelta(days=rng.randint(0, 60))
+        end = start + timedelta(days=rng.randint(-3, 10))
+        chapters.append(Chapter.from_fields(f"{index}.nwd", f"Scene {index}", rng.choice(PLOTS), "", "", "",
+                                            start, end))
+    return chapters
+
+
+def brute_force_hit(layout, x, y):
+    # The lowest index whose rectangle contains (x, y), edges included
+    for index in range(len(layout)):
+        left, right = sorted((layout.lefts[index], layout.lefts[index] + layout.widths[index]))
+        if left <= x <= right and abs(layout.positions[index] - y) <= BAR_HEIGHT / 2:
+            return index
+    return None
+
+
+class TestHitTest(unittest.TestCase):
+    def test_matches_brute_force(self):
+        rng = random.Random(11)
+        for _ in range(20):
+            table = ChapterTable(random_chapters(rng, rng.randint(0, 60)))
+            layout = TimelineLayout(table, table.plot_groups(range(len(table))))
+            if not len(layout):
+                self.assertIsNone(layout.hit_test(0, 0))
+                continue
+            x_min, x_max = layout.lefts.min() - 2, (layout.lefts + layout.widths).max() + 2
+            y_max = layout.positions.max() + 1
+            points = [(rng.uniform(x_min, x_max), rng.uniform(-0.5, y_max)) for _ in range(200)]
+            # Whole days and the exact bar edges, where off-by-one mistakes show up
+            for index in rng.sample(range(len(layout)), min(20, len(layout))):
+                left, position = layout.lefts[index], layout.positions[index]
+                for dy in (-BAR_HEIGHT / 2, 0, BAR_HEIGHT / 2):
+                    points.append((left, position + dy))
+                    points.append((left + layout.widths[index], position + dy))
+                points.append((round(rng.uniform(x_min, x_max)), position))
+            for x, y in points:
+                self.assertEqual(layout.hit_test(x, y), brute_force_hit(layout, x, y), (x, y))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -3,26 +3,36 @@ import datetime
 import matplotlib
 import matplotlib.pyplot as plt
 import matplotlib.dates as mdates
-from PyQt5.QtWidgets import QApplication, QMainWindow, QVBoxLayout, QWidget, QLineEdit, QPushButton, QFormLayout, QHBoxLayout, QPlainTextEdit, QLabel, QSlider, QDateEdit
+import numpy as np
+from matplotlib.collections import PolyCollection
+from matplotlib.transforms import Bbox
+from PyQt5.QtWidgets import QApplication, QMainWindow, QVBoxLayout, QWidget, QLineEdit, QPushButton, QFormLayout, QHBoxLayout, QPlainTextEdit, QLabel, QSlider, QDateEdit, QMessageBox, QComboBox, QCheckBox, QFileDialog
 from PyQt5.QtGui import QKeyEvent
-from PyQt5.QtCore import Qt
+from PyQt5.QtCore import Qt, QTimer
 from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
 from Document import Document
+from TimelineLayout import TimelineLayout, BAR_HEIGHT, day_to_num, num_to_date, text_width
+from RenderScheduler import RenderScheduler
+from DirectoryWatcher import DirectoryWatcher
+from BackgroundSave import BackgroundSave
+from Tracer import tracer
 matplotlib.use('Qt5Agg')  # Ensure the correct backend for PyQt5
 
 
+# Journaled edits after which the editor saves them to the .nwd files by itself
+COMPACT_AFTER_EDITS = 200
+
+
 # PyQt Main Window Class
 class chapterTimelineEditor(QMainWindow):
-    def __init__(self):
+    def __init__(self, roots, watch=True):
         super().__init__()
 
-        # load Data from dir ["chapter", "path", "plot", "synopsis", "startdate", "enddate"]
-        self.document = Document("/home/willem/Documents/Eigen maaksels/Verhalen staan buiten bin en in dropbox/radio controlled/content")
-        # self.directory_handler = Directory_handler("/home/willem/Documents/Eigen maaksels/Verhalen staan buiten bin en in dropbox/test/content")
-        self.document.read()
+        # load Data from one or more content dirs ["chapter", "path", "plot", "synopsis", "startdate", "enddate"]
+        self.document = Document(roots, lazy_synopsis=True)  # only the selected chapter's synopsis is shown
         self.selected_chapter = None  # Track the currently selected chapter
 
-        self.setWindowTitle("Interactive Timeline Editor")
+        self.setWindowTitle("Interactive Timeline Editor - " + ", ".join(self.document.projects.values()))
         self.setGeometry(0, 0, 1920, 1600)
 
         self.central_widget = QWidget(self)
@@ -72,6 +82,19 @@ class chapterTimelineEditor(QMainWindow):
         self.update_chapter_button.clicked.connect(self.update_chapter)
         self.save_timelines_button.clicked.connect(self.save_timelines)
         self.reload_timelines_button.clicked.connect(self.reload_timelines)
+        self.save_thread = None  # BackgroundSave while a save is running
+        self.save_again = False
+
+        # Show one project or all of them, per project or with equally named plots taken together
+        self.project_layout = QHBoxLayout()
+        self.project_filter = QComboBox(self)
+        self.project_filter.addItem("All projects")
+        self.project_filter.addItems(self.document.projects.values())
+        self.group_by_project = QCheckBox("Group by project", self)
+        self.group_by_project.setChecked(len(self.document.roots) > 1)
+        self.project_layout.addWidget(self.project_filter)
+        self.project_layout.addWidget(self.group_by_project)
+        layout.addLayout(self.project_layout)
 
         # Add sliders for filtering by start and end dates
         self.start_slider_label = QLabel("Start: N/A", self)
@@ -88,6 +111,19 @@ class chapterTimelineEditor(QMainWindow):
         layout.addWidget(self.end_slider_label)
         layout.addWidget(self.end_slider)
 
+        # Slider, resize and edit events only ask for a redraw; the scheduler does at most one per frame
+        self.render_scheduler = RenderScheduler(self.update_timeline)
+        self.project_filter.currentIndexChanged.connect(self.render_scheduler.request)
+        self.group_by_project.stateChanged.connect(self.render_scheduler.request)
+        self.view_scheduler = RenderScheduler(self.redraw_view)
+
+        # Viewport mode: the artists hold every chapter and the sliders, mouse wheel and dragging only move the
+        # axis limits. Without it the sliders filter the chapters and rebuild the figure.
+        self.viewport_mode = True
+        self.view = None  # (xlim, ylim) of the last navigation, kept over rebuilds
+        self.pan_start = None
+        self.timeline_layout = None
+
         # Set slider limits
         self.setup_sliders()
 
@@ -96,8 +132,14 @@ class chapterTimelineEditor(QMainWindow):
         self.end_slider.valueChanged.connect(self.update_slider_labels)
     
         self.selected_chapter = None  # Initially, no chapter is selected
+        self.static_layer = None  # Axes, bars and labels as rasterized by the last full draw
+        self.overlay_area = None  # Screen area the overlay covered in the last frame
+        self.hovered_chapter = None
+        self.overlay_scheduler = RenderScheduler(self.render_overlay)
+        self.label_detail = True  # Only label bars that are wide enough on screen
 
-        self.update_timeline()  # Initial drawing of the timeline
+        self.canvas.mpl_connect('draw_event', self.on_draw)
+        self.render_scheduler.flush()  # Initial drawing of the timeline
 
         # Connect the canvas resize event to dynamically scale the labels
         self.canvas.mpl_connect('resize_event', self.on_resize)
@@ -105,6 +147,19 @@ class chapterTimelineEditor(QMainWindow):
         # Connect the canvas click event to the chapter selection
         self.canvas.mpl_connect('button_press_event', self.on_canvas_click)
 
+        # Zoom with the mouse wheel (ctrl: vertically), pan by dragging outside the bars
+        self.canvas.mpl_connect('scroll_event', self.on_scroll)
+        self.canvas.mpl_connect('motion_notify_event', self.on_mouse_move)
+        self.canvas.mpl_connect('button_release_event', self.on_mouse_release)
+
+        # Pick up chapters edited elsewhere (e.g. in novelWriter) without a full reload
+        self.watchers = []
+        if watch:
+            self.watchers = [DirectoryWatcher(root) for root in self.document.roots]
+            self.watch_timer = QTimer(self)
+            self.watch_timer.timeout.connect(self.poll_watcher)
+            self.watch_timer.start(250)
+
     def keyPressEvent(self, event):
         if isinstance(event, QKeyEvent):
             if event.key() == 16777249:
@@ -120,12 +175,9 @@ class chapterTimelineEditor(QMainWindow):
     
     def setup_sliders(self):
         """Initialize sliders based on data range."""
-        min_date = min(ch.startdate for ch in self.document.chapters)
-        max_date = max(ch.enddate for ch in self.document.chapters)
-
-        # Convert dates to numerical format for sliders
-        min_num = mdates.date2num(min_date)
-        max_num = mdates.date2num(max_date)
+        # Day numbers of the table, in the numerical format of the sliders
+        min_num = day_to_num(int(self.document.table.starts.min()))
+        max_num = day_to_num(int(self.document.table.ends.max()))
 
         self.start_slider.setMinimum(int(min_num))
         self.start_slider.setMaximum(int(max_num))
@@ -139,8 +191,8 @@ class chapterTimelineEditor(QMainWindow):
 
 
     def update_slider_labels(self):
-        start_filter = mdates.num2date(self.start_slider.value()).replace(tzinfo=None)
-        end_filter = mdates.num2date(self.end_slider.value()).replace(tzinfo=None)
+        start_filter = num_to_date(self.start_slider.value())
+        end_filter = num_to_date(self.end_slider.value())
 
         if start_filter > end_filter:
             return  
@@ -148,27 +200,50 @@ class chapterTimelineEditor(QMainWindow):
         self.start_slider_label.setText(f"Start: {start_filter.strftime('%Y-%m-%d')}")
         self.end_slider_label.setText(f"End: {end_filter.strftime('%Y-%m-%d')}")
 
-        self.update_timeline()
-
-    def create_plot_groups(self, filtered_chapters):
-        plot_groups = {}
-        for chapter in filtered_chapters:
-            plot_list = chapter.plot.split(",")
-            for p in plot_list:
-                plot = p.strip()
-                if plot not in plot_groups:
-                    plot_groups[plot] = []
-                plot_groups[plot].append(chapter)
-        # Nu de lijsten binnen plot_groups sorteren op begindatum en daarna einddatum om ze later verspringend te kunnen maken
-        for plot, chapters in plot_groups.items():
-            plot_groups[plot] = sorted(chapters, key = lambda x: (x.startdate, x.enddate))
-
-        # for plot, chapters in plot_groups.items():
-        #     for chapter in chapters:
-        #         print(f'{plot}: {chapter["startdate"]}  , {chapter["enddate"]}')
-
-        return plot_groups
-
+        if self.viewport_mode and self.timeline_layout is not None:
+            ylim = self.view[1] if self.view else None
+            self.set_view((self.start_slider.value(), self.end_slider.value()), ylim)
+        else:
+            self.render_scheduler.request()
+
+    def sync_sliders(self, x_min, x_max):
+        # Follow zooming and panning with the sliders without moving the view again
+        for slider, value in ((self.start_slider, x_min), (self.end_slider, x_max)):
+            slider.blockSignals(True)
+            slider.setValue(int(min(max(value, slider.minimum()), slider.maximum())))
+            slider.blockSignals(False)
+        self.start_slider_label.setText(f"Start: {num_to_date(self.start_slider.value()).strftime('%Y-%m-%d')}")
+        self.end_slider_label.setText(f"End: {num_to_date(self.end_slider.value()).strftime('%Y-%m-%d')}")
+
+    def set_view(self, xlim, ylim=None):
+        # Only the axis limits change; the bars are not rebuilt
+        ax = self.bar_collection.axes
+        if xlim[0] >= xlim[1]:
+            return
+        ax.set_xlim(xlim)
+        if ylim is not None:
+            ax.set_ylim(ylim)
+        self.view = (ax.get_xlim(), ax.get_ylim())
+        self.view_scheduler.request()
+
+    def redraw_view(self):
+        if self.render_scheduler.pending():
+            return  # the rebuild draws the new view anyway
+        if self.label_detail:
+            self.refresh_labels()  # which labels fit depends on the zoom
+        self.static_layer = None
+        with tracer.span("canvas.draw"):
+            self.canvas.draw()
+
+    @tracer.traced("create_plot_groups")
+    def create_plot_groups(self, start_filter, end_filter):
+        # Plot -> table rows sorted on start and end date, so they can be staggered later.
+        # Document keeps the groups sorted itself; this only picks the rows in the date range.
+        projects = [self.project_filter.currentText()] if self.project_filter.currentIndex() > 0 else None
+        return self.document.plot_groups(start_filter, end_filter, projects=projects,
+                                         by_project=self.group_by_project.isChecked())
+
+    @tracer.traced("update_timeline")
     def update_timeline(self):
         # Clear the canvas
         self.figure.clf()
@@ -177,13 +252,11 @@ class chapterTimelineEditor(QMainWindow):
         # Matplotlib part for plotting the timeline
         ax = self.figure.add_subplot(111)
 
-        start_filter = mdates.num2date(self.start_slider.value()).date()
-        end_filter = mdates.num2date(self.end_slider.value()).date()
-
-        filtered_chapters = [
-            ch for ch in self.document.chapters
-            if ch.startdate >= start_filter and ch.enddate <= end_filter
-        ]
+        if self.viewport_mode:
+            start_filter, end_filter = datetime.date.min, datetime.date.max  # everything; the sliders set the view
+        else:
+            start_filter = num_to_date(self.start_slider.value())
+            end_filter = num_to_date(self.end_slider.value())
 
         # Set date formatting
         ax.xaxis.set_major_formatter(mdates.DateFormatter("%Y-%m-%d"))
@@ -191,36 +264,37 @@ class chapterTimelineEditor(QMainWindow):
         ax.set_title("chapter Timeline", fontsize = scaledFontSize)
 
         # Group chapters by plot
-        plot_groups = self.create_plot_groups(filtered_chapters)
-        plot_list = sorted(list(plot_groups.keys()), reverse=True)
-        
-        # Generate Y positions based on plot (each plot corresponds to a project)
-        plot_y_positions = {plot: idx + 1 for idx, plot in enumerate(plot_list)}  # Assign Y positions to plots
-
-        # Draw each chapter on its respective plot
-        self.rectangles = []  # List to store all rectangle objects (bars)
-        
-        for plot in plot_list:
-            j = 0
-            for chapter in plot_groups[plot]:
-                color = "orange" if chapter == self.selected_chapter else "skyblue"  # Highlight selected chapter
-                j = (j + 1)% 3
-                plot_position = plot_y_positions[plot] + (j/3) -(1/3)  # Get Y position for the chapter's plot
-                bar_container = ax.barh(plot_position, (chapter.enddate - chapter.startdate).days,0.3,
-                                        left=mdates.date2num(chapter.startdate), color=color)
-                for rect in bar_container:  # Extract each rectangle from the BarContainer
-                    rect.set_label(chapter.chapter)  # Store the chapter name in the label
-                    self.rectangles.append((rect, chapter))  # Store the chapter with the corresponding rectangle
-
-                    # Add chapter name to the center of the bar                    
-                    ax.text(
-                        mdates.date2num(chapter.startdate) + (chapter.enddate - chapter.startdate).days / 2,
-                        plot_position,
-                        chapter.chapter,
-                        ha="center", va='center', color="black", fontsize = scaledFontSize)
+        plot_groups = self.create_plot_groups(start_filter, end_filter)
+        same_layout = self.timeline_layout is not None and self.timeline_layout.plot_groups is plot_groups
+        if not same_layout:
+            self.timeline_layout = TimelineLayout(self.document.table, plot_groups)  # lanes are only packed again after data changes
+        plot_list = self.timeline_layout.plot_list
+
+        # All bars go into one collection; colors are a single (n, 4) array
+        # Bars and labels are animated: a full draw leaves them out and on_draw paints them before caching the static layer
+        self.bar_collection = PolyCollection(self.timeline_layout.bar_vertices(), facecolors="skyblue", linewidths=0,
+                                             animated=True)
+        if len(self.timeline_layout):
+            self.bar_collection.sticky_edges.x.append(self.timeline_layout.lefts.min())  # like barh: no margin left of the first bar
+        ax.add_collection(self.bar_collection)
+        ax.autoscale_view()
+
+        # Overlay: selection, hovered bar and its name, drawn over the static layer on every frame they change
+        self.selection_collection = PolyCollection([], facecolors="orange", linewidths=0, animated=True)
+        self.hover_collection = PolyCollection([], facecolors="none", edgecolors="black", linewidths=1, animated=True)
+        ax.add_collection(self.selection_collection, autolim=False)
+        ax.add_collection(self.hover_collection, autolim=False)
+        self.hover_text = ax.text(0, 0, "", ha="center", va="bottom", fontsize = scaledFontSize, animated=True,
+                                  bbox=dict(facecolor="white", edgecolor="none", alpha=0.8))
+        self.place_overlay()
+        if self.viewport_mode and self.view is not None:
+            ax.set_xlim(self.view[0])
+            if same_layout:
+                ax.set_ylim(self.view[1])  # other plots means other rows: keep the height autoscaled
+            self.view = (ax.get_xlim(), ax.get_ylim())
 
         # Adjust Y-axis to show names
-        ax.set_yticks(range(1, len(plot_list) + 1))
+        ax.set_yticks(self.timeline_layout.plot_ticks)
         ax.set_yticklabels(plot_list, fontsize = scaledFontSize)
 
         # Scale the X-ticks (dates) with the window size
@@ -229,8 +303,96 @@ class chapterTimelineEditor(QMainWindow):
         # Prevent layout issues
         self.figure.tight_layout()
 
+        self.label_texts = []
+        self.refresh_labels()
+
         # Update canvas
-        self.canvas.draw()
+        self.static_layer = None
+        with tracer.span("canvas.draw"):
+            self.canvas.draw()
+
+    def refresh_labels(self):
+        # Add chapter name to the center of the bar; with label_detail only where it fits, now the axes size is known
+        ax = self.bar_collection.axes
+        scaledFontSize = self.get_scaled_font_size()
+        for text in self.label_texts:
+            text.remove()
+        if self.label_detail:
+            (x_min, x_max), (y_min, y_max) = ax.get_xlim(), ax.get_ylim()
+            labels = self.timeline_layout.fitted_labels(x_min, x_max, y_min, y_max, ax.bbox.width, scaledFontSize,
+                                                        self.figure.dpi)
+        else:
+            labels = zip(*self.timeline_layout.label_positions(), map(self.timeline_layout.label, range(len(self.timeline_layout))))
+        labels = list(labels)
+        self.label_anchors = np.array([(x, y) for x, y, _ in labels], dtype=float).reshape(-1, 2)
+        self.label_fontsize = scaledFontSize
+        self.label_texts = [
+            ax.text(x, y, label, ha="center", va='center', color="black", fontsize = scaledFontSize, animated=True)
+            for x, y, label in labels]
+
+    def on_draw(self, event):
+        # Runs inside every full canvas.draw(), so once per data or view change: paint the bars and labels,
+        # keep the result as the static layer and put the overlay on top
+        ax = self.bar_collection.axes
+        ax.draw_artist(self.bar_collection)
+        for text in self.label_texts:
+            ax.draw_artist(text)
+        self.static_layer = self.canvas.copy_from_bbox(self.figure.bbox)
+        self.overlay_area = self.draw_overlay()
+
+    def place_overlay(self):
+        # Point the overlay artists at the selected and hovered chapters
+        vertices = self.timeline_layout.bar_vertices()
+        self.selection_collection.set_verts(vertices[self.timeline_layout.bar_indices(self.selected_chapter)])
+        hovered = self.timeline_layout.bar_indices(self.hovered_chapter)
+        self.hover_collection.set_verts(vertices[hovered])
+        self.hover_text.set_visible(len(hovered) > 0)
+        if len(hovered):
+            index = hovered[0]
+            self.hover_text.set_position((self.timeline_layout.lefts[index] + self.timeline_layout.widths[index] / 2,
+                                          self.timeline_layout.positions[index] + BAR_HEIGHT / 2))
+            self.hover_text.set_text(self.timeline_layout.label(index))
+
+    def draw_overlay(self):
+        # Draw the overlay artists on the canvas and return the screen area they cover
+        ax = self.bar_collection.axes
+        vertices = self.timeline_layout.bar_vertices()
+        indices = np.concatenate([self.timeline_layout.bar_indices(self.selected_chapter),
+                                  self.timeline_layout.bar_indices(self.hovered_chapter)])
+        if not len(indices):
+            return None
+        corners = ax.transData.transform(vertices[indices].reshape(-1, 2))
+        (x0, y0), (x1, y1) = corners.min(axis=0), corners.max(axis=0)
+        area = Bbox([[np.floor(x0) - 2, np.floor(y0) - 2], [np.ceil(x1) + 2, np.ceil(y1) + 2]])
+        ax.draw_artist(self.selection_collection)
+        # Labels under the selected bars were painted over, put them back on top. A centered label's extent
+        # follows from its anchor and its cached text width, no label has to be laid out for it
+        anchors = ax.transData.transform(self.label_anchors)
+        half_height = self.label_fontsize * self.figure.dpi / 72  # generous, a label drawn twice looks the same
+        for i in np.flatnonzero((anchors[:, 1] - half_height < area.y1) & (anchors[:, 1] + half_height > area.y0)):
+            half_width = text_width(self.label_texts[i].get_text(), self.label_fontsize, self.figure.dpi) / 2
+            if anchors[i, 0] - half_width < area.x1 and anchors[i, 0] + half_width > area.x0:
+                ax.draw_artist(self.label_texts[i])
+        ax.draw_artist(self.hover_collection)
+        if self.hover_text.get_visible():
+            ax.draw_artist(self.hover_text)
+            area = Bbox.union([area, self.hover_text.get_window_extent(self.canvas.get_renderer()).padded(2)])
+        return Bbox.intersection(area, self.figure.bbox)
+
+    @tracer.traced("overlay")
+    def render_overlay(self):
+        # One frame of interactive feedback: the static layer is pasted back, the overlay drawn on it and only
+        # the area the overlay covers now or covered before is blitted to the screen
+        self.place_overlay()
+        if self.static_layer is None:
+            self.canvas.draw()
+            return
+        self.canvas.restore_region(self.static_layer)
+        area = self.draw_overlay()
+        dirty = [a for a in (self.overlay_area, area) if a is not None]
+        self.overlay_area = area
+        if dirty:
+            self.canvas.blit(Bbox.union(dirty))
 
     def get_scaled_font_size(self):
         # Scale font size based on figure size
@@ -262,74 +424,185 @@ class chapterTimelineEditor(QMainWindow):
             print(f"Error: {e}")   
        
         try:
-            self.selected_chapter.chapter = name
-            self.selected_chapter.startdate = startdate_datetime
-            self.selected_chapter.enddate = enddate_datetime
-            self.selected_chapter.plot = plot
-            self.selected_chapter.pov = pov
-            self.selected_chapter.char = char
-            self.selected_chapter.synopsis = synopsis
-
-            if mdates.date2num(startdate_datetime) < self.start_slider.minimum() or mdates.date2num(enddate_datetime) > self.end_slider.maximum():
+            changed = self.document.update_chapter(
+                self.selected_chapter, chapter=name, startdate=startdate_datetime, enddate=enddate_datetime,
+                plot=plot, pov=pov, char=char, synopsis=synopsis)
+            if not changed:
+                return  # Nothing edited, keep the current figure
+            journal = self.document.journal
+            if journal is not None and journal.records >= COMPACT_AFTER_EDITS:
+                self.save_timelines()  # the edits are safe in the journal, the .nwd files are rewritten in batches
+
+            if (day_to_num(self.selected_chapter.start_day) < self.start_slider.minimum()
+                    or day_to_num(self.selected_chapter.end_day) > self.end_slider.maximum()):
                 self.setup_sliders()
-            self.update_timeline()
+            self.render_scheduler.request()
 
         except ValueError as e:
             print(f"Error: {e}")
     
     def save_timelines(self):
-        self.document.write()
+        # Writes a snapshot of the edited chapters on a worker thread; editing can go on meanwhile
+        if self.save_thread is not None:
+            self.save_again = True  # edits made since the running save started are written after it
+            return
+        snapshot = self.document.snapshot()
+        if not snapshot:
+            self.on_save_completed([], [])
+            return
+        self.save_thread = BackgroundSave(self.document, snapshot, self)
+        self.save_thread.progress.connect(self.on_save_progress)
+        self.save_thread.completed.connect(self.on_save_completed)
+        self.save_thread.finished.connect(self.on_save_finished)
+        self.save_thread.start()
+
+    def on_save_progress(self, done, total):
+        self.statusBar().showMessage(f"Saving {done}/{total}")
+
+    def on_save_completed(self, written, failures):
+        self.document.finish_write(written, failures)
+        message = f"Saved {len(written)} changed chapter(s)"
+        if failures:
+            message += f", {len(failures)} failed"
+        print(message)
+        self.statusBar().showMessage(message, 5000)
+        if failures:
+            QMessageBox.warning(self, "Save timelines", "These chapters could not be saved and are still marked as changed:\n\n"
+                                + "\n".join(f"{chapter.path}: {error}" for chapter, error in failures))
+
+    def on_save_finished(self):
+        self.save_thread = None
+        if self.save_again:
+            self.save_again = False
+            self.save_timelines()
+
+    def closeEvent(self, event):
+        if self.save_thread is not None:
+            self.save_thread.wait()  # never quit halfway a save
+        super().closeEvent(event)
 
     def reload_timelines(self):
         self.document.read()
-        self.selected_chapter = None  # Track the currently selected chapter
-        self.update_timeline()
+        self.reselect()
+        self.render_scheduler.request()
+
+    def poll_watcher(self):
+        if self.save_thread is not None:
+            return  # our own writes; picked up once the save is done and the document knows about them
+        paths = [path for watcher in self.watchers for path in watcher.poll()]
+        if paths and self.document.read_paths(paths):
+            self.reselect()
+            self.render_scheduler.request()
+
+    def reselect(self):
+        # Keep the selection if the chapter's file still exists. A re-parsed chapter is a new object with what
+        # is on disk now: the form has to show that, or the next update_chapter() writes the old values back
+        if self.selected_chapter is None:
+            return
+        chapter = self.document.chapters_by_path.get(self.selected_chapter.path)
+        if chapter is None:
+            self.selected_chapter = None
+        elif chapter is not self.selected_chapter:
+            self.show_chapter(chapter)
 
     def on_resize(self, event):
         # Update the font size when resizing
-        self.update_timeline()
+        self.render_scheduler.request()
 
-    def on_canvas_click(self, event):
-        # Check for click in each rectangle (chapter bar)
+    def on_scroll(self, event):
+        if not self.viewport_mode or event.inaxes is None or event.inaxes is not self.bar_collection.axes:
+            return
+        ax = self.bar_collection.axes
+        factor = 0.8 ** event.step  # wheel up zooms in, around the mouse position
+        if self.ctrl_pressed or event.key == 'control':
+            y_min, y_max = ax.get_ylim()
+            self.set_view(ax.get_xlim(), (event.ydata - (event.ydata - y_min) * factor,
+                                          event.ydata + (y_max - event.ydata) * factor))
+        else:
+            x_min, x_max = ax.get_xlim()
+            x_min, x_max = event.xdata - (event.xdata - x_min) * factor, event.xdata + (x_max - event.xdata) * factor
+            self.set_view((x_min, x_max))
+            self.sync_sliders(x_min, x_max)
+
+    def on_mouse_move(self, event):
+        if self.pan_start is None:
+            self.update_hover(event)
+            return
+        x, y, (x_min, x_max), (y_min, y_max) = self.pan_start
+        ax = self.bar_collection.axes
+        dx = (event.x - x) * (x_max - x_min) / ax.bbox.width
+        dy = (event.y - y) * (y_max - y_min) / ax.bbox.height
+        self.set_view((x_min - dx, x_max - dx), (y_min - dy, y_max - dy))
+        self.sync_sliders(x_min - dx, x_max - dx)
+
+    def update_hover(self, event):
+        chapter = None
+        if event.inaxes is not None and event.inaxes is self.bar_collection.axes:
+            index = self.timeline_layout.hit_test(event.xdata, event.ydata)
+            if index is not None:
+                chapter = self.timeline_layout.chapter(index)
+        if chapter is not self.hovered_chapter:
+            self.hovered_chapter = chapter
+            self.overlay_scheduler.request()
+
+    def on_mouse_release(self, event):
+        self.pan_start = None
 
-        for rect, chapter in self.rectangles:
-            if rect.contains(event)[0]:  # Check if click is within the rectangle
-                self.update_chapter()
-                try:# Tijdelijk verwijderen signal om problemen te voorkomen
-                    self.startdate_date_entry.dateTimeChanged.disconnect()
-                    self.duur_entry.textChanged.disconnect()
-                except Exception: pass
+    def on_canvas_click(self, event):
+        # Look the click up in the layout's hit index instead of asking every artist
+        if event.inaxes is None or event.inaxes is not self.bar_collection.axes:
+            return
+        index = self.timeline_layout.hit_test(event.xdata, event.ydata) if event.button == 1 else None
+        if index is None:
+            if self.viewport_mode:
+                ax = self.bar_collection.axes
+                self.pan_start = (event.x, event.y, ax.get_xlim(), ax.get_ylim())
+            return
+        chapter = self.timeline_layout.chapter(index)
 
+        self.update_chapter()
+        self.show_chapter(chapter)
+        print(f"Selected chapter: {self.selected_chapter.chapter}")
 
+        self.overlay_scheduler.request()  # Highlight the selected chapter
 
-                self.selected_chapter = chapter
-                print(f"Selected chapter: {self.selected_chapter.chapter}")
+    def show_chapter(self, chapter):
+        # Select chapter and fill the form with it, without the form pushing anything back meanwhile
+        try:# Tijdelijk verwijderen signal om problemen te voorkomen
+            self.startdate_date_entry.dateTimeChanged.disconnect()
+            self.duur_entry.textChanged.disconnect()
+        except Exception: pass
 
-                # Populate the text boxes with the selected chapter information
-                self.chapter_name_entry.setText(self.selected_chapter.chapter)
-                self.startdate_date_entry.setDate(self.selected_chapter.startdate)
-                self.duur_entry.setText(str((self.selected_chapter.enddate-self.selected_chapter.startdate).days))
-                self.plot_name_entry.setText(self.selected_chapter.plot)
-                self.pov_name_entry.setText(self.selected_chapter.pov)
-                self.char_name_entry.setText(self.selected_chapter.char)
-                self.synopsis_name_entry.setPlainText(self.selected_chapter.synopsis)
 
-                # Bijwerken na verandering via signal
-                self.startdate_date_entry.dateTimeChanged.connect(lambda: self.update_chapter()) 
-                self.duur_entry.textChanged.connect(self.update_chapter)
 
+        self.selected_chapter = chapter
 
-                self.update_timeline()  # Re-renddateer the timeline with the selected chapter highlighted
-                break  # Stop further checking after finding the clicked chapter
+        # Populate the text boxes with the selected chapter information
+        self.chapter_name_entry.setText(self.selected_chapter.chapter)
+        self.startdate_date_entry.setDate(self.selected_chapter.startdate)
+        self.duur_entry.setText(str((self.selected_chapter.enddate-self.selected_chapter.startdate).days))
+        self.plot_name_entry.setText(self.selected_chapter.plot)
+        self.pov_name_entry.setText(self.selected_chapter.pov)
+        self.char_name_entry.setText(self.selected_chapter.char)
+        self.synopsis_name_entry.setPlainText(self.selected_chapter.synopsis)
 
-                # Connect update event to edit fields
+        # Bijwerken na verandering via signal
+        self.startdate_date_entry.dateTimeChanged.connect(lambda: self.update_chapter()) 
+        self.duur_entry.textChanged.connect(self.update_chapter)
 
 
 
 # PyQt Application
 def main():
+    # timeline_form.py <content directory> [<content directory> ...], without arguments a folder is asked for
     app = QApplication(sys.argv)
-    window = chapterTimelineEditor()
+    roots = app.arguments()[1:]
+    if not roots:
+        root = QFileDialog.getExistingDirectory(None, "Choose the content folder of a novelWriter project")
+        if not root:
+            return
+        roots = [root]
+    window = chapterTimelineEditor(roots)
     window.show()
     sys.exit(app.exec_())
 